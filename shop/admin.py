@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .models import Category, Product, Cart, CartItem, Order, OrderItem, Job, EmailOutbox, StockReservation
 
 
 @admin.register(Category)
@@ -42,7 +42,11 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'session_key', 'get_item_count', 'get_total', 'created_at')
+    list_select_related = ('user',)
     readonly_fields = ('session_key', 'created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
     
     def get_item_count(self, obj):
         return obj.get_item_count()
@@ -56,6 +60,7 @@ class CartAdmin(admin.ModelAdmin):
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'cart', 'product', 'quantity', 'get_subtotal')
+    list_select_related = ('cart__user', 'product')
     readonly_fields = ('added_at',)
     
     def get_subtotal(self, obj):
@@ -88,7 +93,7 @@ class OrderAdmin(admin.ModelAdmin):
         'user__email'
     )
 
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'invoice_version', 'invoice_sha256', 'invoice_rendered_at')
 
     fieldsets = (
         ('User Account', {   # ✅ NEW SECTION
@@ -107,6 +112,10 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
+        ('Invoice', {
+            'fields': ('invoice_version', 'invoice_sha256', 'invoice_rendered_at'),
+            'classes': ('collapse',)
+        }),
     )
 
 
@@ -124,6 +133,7 @@ class OrderItemAdmin(admin.ModelAdmin):
         'get_subtotal'
     )
 
+    list_select_related = ('order__user', 'product')
     readonly_fields = ('price',)
 
     search_fields = (
@@ -145,3 +155,28 @@ class OrderItemAdmin(admin.ModelAdmin):
             return obj.order.user.username
         return "Guest"
     get_user.short_description = 'User'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'last_error')
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'template', 'to_email', 'status', 'created_at', 'sent_at')
+    list_filter = ('status', 'template')
+    search_fields = ('to_email', 'order__id')
+    list_select_related = ('order',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cart', 'product', 'quantity', 'expires_at', 'created_at')
+    list_select_related = ('product',)
+    raw_id_fields = ('cart', 'product')
+    readonly_fields = ('created_at',)
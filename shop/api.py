@@ -0,0 +1,159 @@
+"""
+Read-only catalog JSON API for the mobile app and partner integrations.
+
+    GET /api/products/             keyset-paged product list (?after=, ?before=,
+                                   ?page_size=, ?category=<slug>)
+    GET /api/products/<id>/        one product
+    GET /api/categories/           all categories with product counts
+
+Every endpoint takes ?fields=a,b,c to return (and load) only those fields.
+Responses carry a strong ETag; send it back in If-None-Match to get a 304.
+Product ETags come from Product.updated_at, so a client can re-sync the
+catalog page by page and only download pages that changed. Each endpoint
+runs a single query.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from .models import Category, Product
+from .pagination import PAGE_SIZE, base_query, paginate
+
+
+MAX_PAGE_SIZE = 100
+
+# field name -> (model column to load, value getter)
+PRODUCT_FIELDS = {
+    'id': ('id', lambda p: p.id),
+    'name': ('name', lambda p: p.name),
+    'description': ('description', lambda p: p.description),
+    'price': ('price', lambda p: str(p.price)),
+    'stock': ('stock', lambda p: p.stock),
+    'in_stock': ('stock', lambda p: p.is_in_stock()),
+    'category': ('category_id', lambda p: p.category_id),
+    'image': ('image', lambda p: p.image.url if p.image else None),
+    'created_at': ('created_at', lambda p: p.created_at.isoformat()),
+    'updated_at': ('updated_at', lambda p: p.updated_at.isoformat()),
+}
+
+CATEGORY_FIELDS = {
+    'id': ('id', lambda c: c.id),
+    'name': ('name', lambda c: c.name),
+    'slug': ('slug', lambda c: c.slug),
+    'description': ('description', lambda c: c.description),
+    'image': ('image', lambda c: c.image.url if c.image else None),
+    'product_count': (None, lambda c: c.product_count),
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def requested_fields(request, available):
+    """Field names from ?fields= (all fields when absent), in the order given"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise FieldError(f"Unknown fields: {', '.join(unknown) or raw}. Available: {', '.join(available)}")
+    return list(dict.fromkeys(names))
+
+
+def columns_for(fields, available, always=()):
+    columns = {available[name][0] for name in fields} | set(always)
+    columns.discard(None)
+    return sorted(columns)
+
+
+def serialize(obj, fields, available):
+    return {name: available[name][1](obj) for name in fields}
+
+
+def make_etag(*parts):
+    digest = hashlib.sha256(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def api_response(request, payload, etag):
+    """JSON response with a strong ETag, or 304 when the client already has it"""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+def field_error(error):
+    return JsonResponse({'error': str(error)}, status=400)
+
+
+@require_safe
+def product_list(request):
+    try:
+        fields = requested_fields(request, PRODUCT_FIELDS)
+        page_size = min(max(int(request.GET.get('page_size', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except FieldError as e:
+        return field_error(e)
+    except ValueError:
+        return JsonResponse({'error': 'page_size must be a number'}, status=400)
+
+    products = Product.objects.only(*columns_for(fields, PRODUCT_FIELDS, always=('id', 'created_at', 'updated_at')))
+    category = request.GET.get('category')
+    if category:
+        products = products.filter(category__slug=category)
+
+    page = paginate(products, after=request.GET.get('after'), before=request.GET.get('before'), page_size=page_size)
+    query = base_query(request)
+    prefix = f"{request.path}?{query + '&' if query else ''}"
+
+    etag = make_etag(
+        fields, page_size, category,
+        [(product.id, product.updated_at) for product in page],
+        page.next_cursor, page.previous_cursor,
+    )
+    payload = {
+        'results': [serialize(product, fields, PRODUCT_FIELDS) for product in page],
+        'next': f"{prefix}after={page.next_cursor}" if page.has_next else None,
+        'previous': f"{prefix}before={page.previous_cursor}" if page.has_previous else None,
+    }
+    return api_response(request, payload, etag)
+
+
+@require_safe
+def product_detail(request, pk):
+    try:
+        fields = requested_fields(request, PRODUCT_FIELDS)
+    except FieldError as e:
+        return field_error(e)
+
+    product = get_object_or_404(
+        Product.objects.only(*columns_for(fields, PRODUCT_FIELDS, always=('id', 'updated_at'))), pk=pk,
+    )
+    etag = make_etag(fields, product.id, product.updated_at)
+    return api_response(request, serialize(product, fields, PRODUCT_FIELDS), etag)
+
+
+@require_safe
+def category_list(request):
+    try:
+        fields = requested_fields(request, CATEGORY_FIELDS)
+    except FieldError as e:
+        return field_error(e)
+
+    categories = Category.objects.only(*columns_for(fields, CATEGORY_FIELDS, always=('id', 'name')))
+    if 'product_count' in fields:
+        categories = categories.annotate(product_count=Count('products'))
+
+    # Categories have no updated_at; their ETag is a hash of the content
+    results = [serialize(category, fields, CATEGORY_FIELDS) for category in categories]
+    return api_response(request, {'results': results}, make_etag(fields, results))
@@ -0,0 +1,275 @@
+"""
+Two-tier cache for shop lookups.
+
+L1 is a small LRU dict inside each worker process. L2 is the shared Django
+cache (settings.CACHES: file-based or Redis). Reads go L1 -> L2 -> loader.
+
+get_or_set() stores a value together with the time it stops being fresh and
+keeps it in L2 for a grace period after that. When a hot key goes stale,
+only the caller that wins an L2 lock recomputes it; every other worker keeps
+serving the stale value in the meantime. An expiry therefore never sends
+every worker to the database at once.
+
+L1 entries live for at most SHOP_CACHE['L1_TIMEOUT'] seconds. delete() can
+only drop this process's L1, so lookups that must change everywhere the
+moment they are invalidated pass l1=False.
+
+delete() also leaves a short-lived tombstone in L2. A rebuild that was
+already running when the key was deleted may have read the old data, so it
+returns its value without storing it when the tombstone changed under it.
+
+Hit, miss, stale and eviction counters are kept per process; see stats().
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULTS = {
+    'L2': 'default',        # CACHES alias shared by all workers
+    'L1_MAX_ENTRIES': 1000,
+    'L1_TIMEOUT': 5,        # seconds a worker may keep its own copy
+    'STALE_GRACE': 60,      # seconds a stale value is served while one worker rebuilds it
+    'LOCK_TIMEOUT': 30,     # upper bound on one rebuild
+    'WAIT_TIMEOUT': 2.0,    # how long a cold miss waits for another worker's rebuild
+}
+
+COUNTERS = ('l1_hits', 'l2_hits', 'misses', 'stale_hits', 'rebuilds', 'waits', 'evictions')
+
+_MISSING = object()
+
+
+class Entry:
+    """A get_or_set value and the time it stops being fresh (None: never)"""
+    __slots__ = ('value', 'fresh_until')
+
+    def __init__(self, value, fresh_until):
+        self.value = value
+        self.fresh_until = fresh_until
+
+    def __getstate__(self):
+        return (self.value, self.fresh_until)
+
+    def __setstate__(self, state):
+        self.value, self.fresh_until = state
+
+    def is_fresh(self, now):
+        return self.fresh_until is None or now < self.fresh_until
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU map with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        """Store and return how many entries had to be evicted"""
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    def __init__(self, **options):
+        config = {**DEFAULTS, **getattr(settings, 'SHOP_CACHE', {}), **options}
+        self.l2_alias = config['L2']
+        self.l1_timeout = config['L1_TIMEOUT']
+        self.stale_grace = config['STALE_GRACE']
+        self.lock_timeout = config['LOCK_TIMEOUT']
+        self.wait_timeout = config['WAIT_TIMEOUT']
+        self.local = LocalLRU(config['L1_MAX_ENTRIES'])
+        self._stats = dict.fromkeys(COUNTERS, 0)
+        self._stats_lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def _remember(self, key, value, now, fresh_until=None):
+        expires_at = now + self.l1_timeout
+        if fresh_until is not None:
+            expires_at = min(expires_at, fresh_until)
+        evicted = self.local.set(key, value, expires_at)
+        if evicted:
+            self._count('evictions', evicted)
+
+    # Plain values
+
+    def get(self, key, default=None, l1=True):
+        now = time.time()
+        if l1:
+            value = self.local.get(key, now)
+            if value is not _MISSING:
+                self._count('l1_hits')
+                return value.value if isinstance(value, Entry) else value
+
+        value = self.l2.get(key, _MISSING)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        if l1:
+            self._remember(key, value, now)
+        return value.value if isinstance(value, Entry) else value
+
+    def get_many(self, keys, l1=True):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, l1=l1)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=None, l1=True):
+        self.l2.set(key, value, timeout)
+        if l1:
+            self._remember(key, value, time.time())
+        else:
+            self.local.delete(key)
+
+    def add(self, key, value, timeout=None):
+        return self.l2.add(key, value, timeout)
+
+    def incr(self, key, delta=1):
+        """Atomic in L2; raises ValueError when the key is missing"""
+        self.local.delete(key)
+        return self.l2.incr(key, delta)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.l2.set(self._tombstone_key(key), uuid.uuid4().hex, self.lock_timeout)
+        self.l2.delete(key)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        self.l2.set_many({self._tombstone_key(key): uuid.uuid4().hex for key in keys}, self.lock_timeout)
+        self.l2.delete_many(keys)
+
+    # Computed values with single-flight rebuilds
+
+    def get_or_set(self, key, loader, timeout, l1=True):
+        """
+        Return the cached value for `key`, calling `loader()` to build it when
+        it is missing or stale. Only one caller across all workers rebuilds a
+        key at a time; the rest serve the stale value, or on a cold miss wait
+        up to WAIT_TIMEOUT for the rebuild before building it themselves.
+        """
+        now = time.time()
+        if l1:
+            entry = self.local.get(key, now)
+            if isinstance(entry, Entry):
+                self._count('l1_hits')
+                return entry.value
+
+        entry = self.l2.get(key)
+        if isinstance(entry, Entry):
+            if entry.is_fresh(now):
+                self._count('l2_hits')
+                if l1:
+                    self._remember(key, entry, now, entry.fresh_until)
+                return entry.value
+            if not self._acquire(key):
+                self._count('stale_hits')
+                return entry.value
+            return self._rebuild(key, loader, timeout, l1)
+
+        self._count('misses')
+        if self._acquire(key):
+            return self._rebuild(key, loader, timeout, l1)
+
+        # Another worker is building it; give it a moment
+        self._count('waits')
+        deadline = now + self.wait_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = self.l2.get(key)
+            if isinstance(entry, Entry):
+                return entry.value
+        return loader()
+
+    def _lock_key(self, key):
+        return f"{key}:rebuild-lock"
+
+    def _tombstone_key(self, key):
+        return f"{key}:deleted"
+
+    def _acquire(self, key):
+        return self.l2.add(self._lock_key(key), 1, self.lock_timeout)
+
+    def _rebuild(self, key, loader, timeout, l1):
+        try:
+            tombstone = self.l2.get(self._tombstone_key(key))
+            value = loader()
+            if self.l2.get(self._tombstone_key(key)) != tombstone:
+                # Deleted while loading: the value may predate the change
+                return value
+            now = time.time()
+            fresh_until = None if timeout is None else now + timeout
+            entry = Entry(value, fresh_until)
+            self.l2.set(key, entry, None if timeout is None else timeout + self.stale_grace)
+            if l1:
+                self._remember(key, entry, now, fresh_until)
+            else:
+                self.local.delete(key)
+            self._count('rebuilds')
+            return value
+        finally:
+            self.l2.delete(self._lock_key(key))
+
+    # Introspection
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['l1_entries'] = len(self.local)
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = dict.fromkeys(COUNTERS, 0)
+
+    def clear_local(self):
+        self.local.clear()
+
+
+shop_cache = TieredCache()
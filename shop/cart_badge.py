@@ -0,0 +1,44 @@
+"""
+Cached cart badge count for the navbar.
+
+The count is cached per user and dropped whenever a CartItem or Cart
+changes, so rendering the badge normally costs no queries. Guests' carts
+live in a signed cookie (shop.guest_cart) and are counted from it directly.
+"""
+from django.db import transaction
+from django.db.models import Sum
+
+from . import guest_cart
+from .caching import shop_cache
+from .models import CartItem
+
+
+CART_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def cart_count_key(user_id):
+    return f"shop:cart_count:user:{user_id}"
+
+
+def get_cart_count(request):
+    """Total quantity in the visitor's cart (2+3+1 = 6)"""
+    if not request.user.is_authenticated:
+        return guest_cart.item_count(guest_cart.load(request))
+
+    items = CartItem.objects.filter(cart__user_id=request.user.id)
+    # Skip the per-process tier: the badge must change on every worker as
+    # soon as the cart does
+    return shop_cache.get_or_set(
+        cart_count_key(request.user.id),
+        lambda: items.aggregate(total=Sum('quantity'))['total'] or 0,
+        CART_COUNT_TIMEOUT,
+        l1=False,
+    )
+
+
+def invalidate_cart_count(cart):
+    """Forget the cached badge of the user the cart belongs to, once the change commits"""
+    if cart.user_id:
+        key = cart_count_key(cart.user_id)
+        # Deleting before commit lets a concurrent read cache the old count
+        transaction.on_commit(lambda: shop_cache.delete(key))
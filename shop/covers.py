@@ -0,0 +1,57 @@
+"""
+Cover images for categories on the home page.
+
+A category without its own image shows its newest product photo. All covers
+are picked in one window-function query and cached until a product or
+category changes.
+"""
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.fields.files import ImageFieldFile
+from django.db.models.functions import RowNumber
+
+from .caching import shop_cache
+from .models import Product
+
+
+COVERS_KEY = 'shop:category_covers'
+COVERS_TIMEOUT = 60 * 60
+
+
+def load_category_covers():
+    """{category_id: image name} of the newest product with an image in each category"""
+    newest_first = (
+        Product.objects
+        .exclude(image__isnull=True).exclude(image='')
+        .filter(category__isnull=False)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F('category_id'),
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ))
+        .filter(position=1)
+        .values_list('category_id', 'image')
+    )
+    return dict(newest_first)
+
+
+def get_category_covers():
+    return shop_cache.get_or_set(COVERS_KEY, load_category_covers, COVERS_TIMEOUT)
+
+
+def invalidate_category_covers():
+    transaction.on_commit(lambda: shop_cache.delete(COVERS_KEY))
+
+
+def attach_covers(categories):
+    """Set `cover` on each category: its own image, else its newest product photo, else None"""
+    covers = get_category_covers()
+    field = Product._meta.get_field('image')
+    for category in categories:
+        if category.image:
+            category.cover = category.image
+        elif category.id in covers:
+            category.cover = ImageFieldFile(None, field, covers[category.id])
+        else:
+            category.cover = None
+    return categories
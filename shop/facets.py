@@ -0,0 +1,216 @@
+"""
+Faceted filtering for the product list.
+
+Filters are query parameters:
+
+    ?category=<slug>,<slug>   products in any of these categories
+    ?price=<band>,<band>      products in any of these price bands (PRICE_BANDS)
+    ?in_stock=1               products with stock > 0
+
+Counts are disjunctive. Each facet's counts apply every *other* active filter,
+so after picking one category the other categories still show how many
+products they would add.
+
+All counts come from one GROUP BY over (category, price band, in stock). That
+"cube" has at most categories x bands x 2 rows. The counts for any filter
+combination are sums over it, so no facet value ever costs a COUNT query. The
+cube and the facets for each normalized filter key are cached under the
+catalog fragment version, which every product or category change bumps.
+
+parse() normalizes a query string: only known values, sorted, one parameter
+each. product_list redirects to that canonical URL, so equal filters always
+share one URL, one cached grid fragment and one facet cache entry.
+"""
+from collections import Counter
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, IntegerField, Q, Value, When
+
+from .caching import shop_cache
+from .fragments import FRAGMENT_TIMEOUT
+from .models import Category, Product
+from .profiling import TRIGGER_PARAM
+
+
+# (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = [
+    ('0-500', 'Under ₹500', None, Decimal('500')),
+    ('500-1000', '₹500 – ₹1,000', Decimal('500'), Decimal('1000')),
+    ('1000-2500', '₹1,000 – ₹2,500', Decimal('1000'), Decimal('2500')),
+    ('2500-5000', '₹2,500 – ₹5,000', Decimal('2500'), Decimal('5000')),
+    ('5000-10000', '₹5,000 – ₹10,000', Decimal('5000'), Decimal('10000')),
+    ('10000-', '₹10,000 and above', Decimal('10000'), None),
+]
+BAND_INDEX = {key: i for i, (key, _, _, _) in enumerate(PRICE_BANDS)}
+
+# Query parameters that survive normalization, in canonical order. The
+# profiler's trigger is kept so staff can profile the listing itself rather
+# than the redirect to it.
+FILTER_PARAMS = ('category', 'price', 'in_stock')
+PAGE_PARAMS = ('after', 'before', 'format', TRIGGER_PARAM)
+
+
+class Filters:
+    """A normalized set of catalog filters"""
+
+    def __init__(self, categories=(), prices=(), in_stock=False):
+        self.categories = tuple(sorted(set(categories)))
+        self.prices = tuple(sorted(set(prices), key=BAND_INDEX.__getitem__))
+        self.in_stock = bool(in_stock)
+
+    def __bool__(self):
+        return bool(self.categories or self.prices or self.in_stock)
+
+    def params(self):
+        """Canonical query parameters, in FILTER_PARAMS order"""
+        params = {}
+        if self.categories:
+            params['category'] = ','.join(self.categories)
+        if self.prices:
+            params['price'] = ','.join(self.prices)
+        if self.in_stock:
+            params['in_stock'] = '1'
+        return params
+
+    def key(self):
+        return urlencode(self.params(), safe=',')
+
+    def toggle(self, facet, value=None):
+        """The filters with one facet value switched on or off"""
+        categories, prices, in_stock = set(self.categories), set(self.prices), self.in_stock
+        if facet == 'category':
+            categories ^= {value}
+        elif facet == 'price':
+            prices ^= {value}
+        else:
+            in_stock = not in_stock
+        return Filters(categories, prices, in_stock)
+
+    def apply(self, queryset, category_ids):
+        """Filter a Product queryset; category_ids maps slug -> id"""
+        if self.categories:
+            queryset = queryset.filter(category_id__in=[category_ids[slug] for slug in self.categories])
+        if self.prices:
+            bands = Q()
+            for key in self.prices:
+                _, _, low, high = PRICE_BANDS[BAND_INDEX[key]]
+                band = Q()
+                if low is not None:
+                    band &= Q(price__gte=low)
+                if high is not None:
+                    band &= Q(price__lt=high)
+                bands |= band
+            queryset = queryset.filter(bands)
+        if self.in_stock:
+            queryset = queryset.filter(stock__gt=0)
+        return queryset
+
+
+def split(params, name):
+    return [value for raw in params.getlist(name) for value in raw.split(',') if value]
+
+
+def parse(params, category_ids):
+    """Filters from a QueryDict, keeping only known categories and bands"""
+    return Filters(
+        categories=[slug for slug in split(params, 'category') if slug in category_ids],
+        prices=[key for key in split(params, 'price') if key in BAND_INDEX],
+        in_stock=params.get('in_stock') in ('1', 'true', 'on'),
+    )
+
+
+def canonical_query(params, filters):
+    """The normalized query string for a request, or None if it already is"""
+    canonical = filters.params()
+    for name in PAGE_PARAMS:
+        if params.get(name):
+            canonical[name] = params[name]
+    query = urlencode(canonical, safe=',')
+    current = urlencode([(name, value) for name, values in params.lists() for value in values], safe=',')
+    return None if query == current else query
+
+
+def cube_key(version):
+    return f"shop:facets:{version}:cube"
+
+
+def load_cube():
+    """Categories and (category_id, band, in_stock, count) cells, in two queries"""
+    band = Case(
+        *[When(price__lt=high, then=Value(i)) for i, (_, _, _, high) in enumerate(PRICE_BANDS) if high is not None],
+        default=Value(len(PRICE_BANDS) - 1),
+        output_field=IntegerField(),
+    )
+    cells = (
+        Product.objects.order_by()
+        .annotate(band=band, available=ExpressionWrapper(Q(stock__gt=0), output_field=BooleanField()))
+        .values_list('category_id', 'band', 'available')
+        .annotate(count=Count('id'))
+    )
+    return {
+        'categories': list(Category.objects.values_list('id', 'slug', 'name')),
+        'cells': list(cells),
+    }
+
+
+def get_cube(version):
+    return shop_cache.get_or_set(cube_key(version), load_cube, FRAGMENT_TIMEOUT)
+
+
+def category_ids(version):
+    return {slug: category_id for category_id, slug, _ in get_cube(version)['categories']}
+
+
+def compute(cube, filters):
+    ids = {slug: category_id for category_id, slug, _ in cube['categories']}
+    selected_categories = {ids[slug] for slug in filters.categories}
+    selected_bands = {BAND_INDEX[key] for key in filters.prices}
+
+    by_category, by_band = Counter(), Counter()
+    in_stock = total = 0
+    for category_id, band, available, count in cube['cells']:
+        category_ok = not selected_categories or category_id in selected_categories
+        band_ok = not selected_bands or band in selected_bands
+        stock_ok = not filters.in_stock or available
+        if band_ok and stock_ok:
+            by_category[category_id] += count
+        if category_ok and stock_ok:
+            by_band[band] += count
+        if category_ok and band_ok and available:
+            in_stock += count
+        if category_ok and band_ok and stock_ok:
+            total += count
+
+    def link(toggled):
+        query = toggled.key()
+        return f"?{query}" if query else '?'
+
+    return {
+        'total': total,
+        'active': bool(filters),
+        'categories': [
+            {
+                'slug': slug, 'name': name, 'count': by_category[category_id],
+                'selected': slug in filters.categories, 'url': link(filters.toggle('category', slug)),
+            }
+            for category_id, slug, name in cube['categories']
+        ],
+        'prices': [
+            {
+                'key': key, 'label': label, 'count': by_band[i],
+                'selected': key in filters.prices, 'url': link(filters.toggle('price', key)),
+            }
+            for i, (key, label, _, _) in enumerate(PRICE_BANDS)
+        ],
+        'in_stock': {'count': in_stock, 'selected': filters.in_stock, 'url': link(filters.toggle('in_stock'))},
+    }
+
+
+def get_facets(filters, version):
+    """Facet counts and toggle links for `filters`, cached per filter key"""
+    return shop_cache.get_or_set(
+        f"shop:facets:{version}:{filters.key()}",
+        lambda: compute(get_cube(version), filters),
+        FRAGMENT_TIMEOUT,
+    )
@@ -1,5 +1,7 @@
+from datetime import datetime, time, timedelta
 from django import forms
 from django.core.validators import MinValueValidator, RegexValidator
+from django.utils import timezone
 from django.contrib.auth.models import User
 from .models import Order, CartItem, Product
 
@@ -141,6 +143,46 @@ class CheckoutForm(forms.ModelForm):
         return postal_code
 
 
+class OrderFilterForm(forms.Form):
+    """Filters for the admin order dashboard (all optional, submitted via GET)"""
+    status = forms.ChoiceField(
+        required=False,
+        choices=[('', 'All statuses')] + Order.ORDER_STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    payment_method = forms.ChoiceField(
+        required=False,
+        choices=[('', 'All payments')] + Order.PAYMENT_METHOD_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+
+    def filter(self, queryset):
+        """Apply the valid filters to an Order queryset"""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('payment_method'):
+            queryset = queryset.filter(payment_method=data['payment_method'])
+        # Compare against day boundaries (not __date) so created_at indexes stay usable
+        if data.get('date_from'):
+            start = datetime.combine(data['date_from'], time.min)
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(start))
+        if data.get('date_to'):
+            end = datetime.combine(data['date_to'] + timedelta(days=1), time.min)
+            queryset = queryset.filter(created_at__lt=timezone.make_aware(end))
+        return queryset
+
+
 # ============================================================================
 # AUTHENTICATION FORMS
 # ============================================================================
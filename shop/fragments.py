@@ -0,0 +1,56 @@
+"""
+Generation counters for cached catalog template fragments.
+
+The category sidebar and product grids are cached with `{% cache %}` under
+keys that include a generation number. Catalog edits bump the generation
+(see shop.signals), which makes every older fragment unreachable at once;
+nothing has to be deleted and no TTL has to guess how stale is acceptable.
+
+Scopes:
+    categories  the sidebar and the category badges in grids
+    products    names, prices, images and stock shown in grids
+"""
+import time
+
+from .caching import shop_cache
+
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+GENERATION_TIMEOUT = None
+
+
+def generation_key(scope):
+    return f"shop:fragments:generation:{scope}"
+
+
+def get_generations(*scopes):
+    """{scope: generation}. Unknown scopes start at a fresh timestamp."""
+    keys = {generation_key(scope): scope for scope in scopes}
+    # Read from the shared tier only, so a bump is seen by every worker at once
+    found = shop_cache.get_many(keys, l1=False)
+    generations = {}
+    for key, scope in keys.items():
+        if key not in found:
+            # A timestamp never repeats a number an evicted counter handed out
+            shop_cache.add(key, time.time_ns(), GENERATION_TIMEOUT)
+            found[key] = shop_cache.get(key, l1=False)
+        generations[scope] = found[key]
+    return generations
+
+
+def bump_generation(*scopes):
+    for scope in scopes:
+        try:
+            shop_cache.incr(generation_key(scope))
+        except ValueError:
+            shop_cache.set(generation_key(scope), time.time_ns(), GENERATION_TIMEOUT, l1=False)
+
+
+def catalog_fragments():
+    """Template context for the cached sidebar and grid fragments"""
+    generations = get_generations('categories', 'products')
+    return {
+        'fragment_timeout': FRAGMENT_TIMEOUT,
+        'category_generation': generations['categories'],
+        'catalog_version': f"{generations['categories']}.{generations['products']}",
+    }
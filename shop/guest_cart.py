@@ -0,0 +1,77 @@
+"""
+Carts for visitors who are not logged in.
+
+A guest cart is a signed cookie holding {product_id: quantity}; it costs no
+session and no database row. When the visitor logs in the lines are merged
+into their Cart and the cookie is dropped. Bots and one-page visitors
+therefore never write to django_session or shop_cart.
+"""
+from django.core import signing
+from django.db import transaction
+
+from . import reservations
+from .models import Cart, CartItem
+
+
+COOKIE_NAME = 'shop_cart'
+COOKIE_SALT = 'shop.guest_cart'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+MAX_LINES = 50
+
+
+def load(request):
+    """{product_id: quantity} from the visitor's cookie; {} if absent or tampered with"""
+    value = request.COOKIES.get(COOKIE_NAME)
+    if not value:
+        return {}
+    try:
+        pairs = signing.loads(value, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE)
+        return {int(product_id): int(quantity) for product_id, quantity in pairs if int(quantity) > 0}
+    except (signing.BadSignature, TypeError, ValueError):
+        return {}
+
+
+def save(response, lines):
+    """Write the lines back to the cookie (or drop it when the cart is empty)"""
+    if not lines:
+        response.delete_cookie(COOKIE_NAME)
+        return response
+    value = signing.dumps(sorted(lines.items()), salt=COOKIE_SALT, compress=True)
+    response.set_cookie(
+        COOKIE_NAME, value, max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax',
+    )
+    return response
+
+
+def item_count(lines):
+    return sum(lines.values())
+
+
+def merge_into_user_cart(user, lines, session_key=''):
+    """Add the guest lines to the user's cart, capped by available stock. Returns the cart."""
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user, defaults={'session_key': session_key or ''})
+        if not lines:
+            return cart
+
+        existing = {item.product_id: item for item in cart.items.filter(product_id__in=lines)}
+        wanted = {
+            product_id: quantity + (existing[product_id].quantity if product_id in existing else 0)
+            for product_id, quantity in lines.items()
+        }
+        # Hold what other carts are not holding; that caps each merged line
+        granted = reservations.reserve_many(cart, wanted)
+        new_items = []
+        for product_id, quantity in granted.items():
+            item = existing.get(product_id)
+            if item is None:
+                if quantity > 0:
+                    new_items.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+            elif quantity > item.quantity:
+                CartItem.objects.filter(pk=item.pk).update(quantity=quantity)
+        if new_items:
+            CartItem.objects.bulk_create(new_items)
+        # The bulk writes bypass CartItem signals; saving the cart refreshes
+        # its badge
+        cart.save(update_fields=['updated_at'])
+    return cart
@@ -0,0 +1,81 @@
+"""
+Conditional and ranged file responses for files kept in media storage.
+"""
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, content_disposition_header
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single-range `Range` header, None when the header
+    should be ignored, or False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def serve_stored_file(request, storage, path, etag, last_modified, filename, content_type):
+    """
+    Stream a stored file with ETag/Last-Modified validators.
+
+    Answers If-None-Match / If-Modified-Since with 304 and single byte ranges
+    (honouring If-Range) with 206, so clients can revalidate or resume cheaply.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    validators = {'ETag': etag, 'Accept-Ranges': 'bytes', 'Cache-Control': 'private, no-cache'}
+    if timestamp is not None:
+        validators['Last-Modified'] = http_date(timestamp)
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    size = storage.size(path)
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, validators.get('Last-Modified'))):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range:
+        start, end = byte_range
+        with storage.open(path, 'rb') as f:
+            f.seek(start)
+            content = f.read(end - start + 1)
+        response = HttpResponse(content, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        response = FileResponse(
+            storage.open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type,
+        )
+        response['Content-Length'] = size
+
+    for header, value in validators.items():
+        response[header] = value
+    return response
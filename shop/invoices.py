@@ -0,0 +1,184 @@
+"""
+Invoice PDF rendering and storage.
+
+Invoices are rendered once per order version and kept in a content-addressed
+store under media/invoices/<sha[:2]>/<sha>.pdf. The version is a hash of
+everything printed on the invoice. Status changes and other edits that do not
+alter the invoice reuse the stored file; changing the order or its items
+renders a new one.
+"""
+import hashlib
+import io
+import json
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+
+def render_invoice_pdf(order):
+    """Draw the invoice for an order and return the PDF bytes"""
+    buffer = io.BytesIO()
+    # invariant output: the same order always produces the same bytes
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+
+    # Colors & fonts
+    p.setStrokeColor(colors.HexColor("#9ca3af"))  # soft gray
+    p.setLineWidth(0.7)
+
+    y = height - 50
+
+    # ===== HEADER =====
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, y, "ShopHub")
+    
+    p.setFont("Helvetica", 11)
+    p.drawRightString(width-50, y, f"Order ID: {order.id}")
+    y -= 20
+    p.drawRightString(width-50, y, f"Date: {order.created_at.strftime('%d-%m-%Y')}")
+
+    # Line
+    y -= 20
+    p.line(50, y, width-50, y)
+
+    # ===== INVOICE TITLE =====
+    y -= 40
+    p.setFont("Helvetica-Bold", 22)
+    p.drawString(50, y, "INVOICE")
+
+    # ===== BILL TO =====
+    y -= 40
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, y, "Bill To:")
+
+    p.setFont("Helvetica", 11)
+    y -= 18
+    p.drawString(50, y, f"Name: {order.first_name} {order.last_name}")
+    y -= 16
+    p.drawString(50, y, f"Phone: {order.phone}")
+    y -= 16
+    p.drawString(50, y, f"Address: {order.address}, {order.city}, {order.state} - {order.postal_code}")
+
+    # ===== TABLE HEADER =====
+    y -= 40
+    p.line(50, y, width-50, y)
+    y -= 20
+
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(50, y, "Item")
+    p.drawString(300, y, "Qty")
+    p.drawString(360, y, "Price")
+    p.drawString(450, y, "Total")
+
+    y -= 10
+    p.line(50, y, width-50, y)
+
+    # ===== ITEMS =====
+    p.setFont("Helvetica", 11)
+    y -= 20
+
+    subtotal = Decimal("0.00")
+
+    for item in order.items.select_related('product'):
+        line_total = item.price * item.quantity
+        subtotal += line_total
+
+        p.drawString(50, y, item.product.name[:40])
+        p.drawString(300, y, str(item.quantity))
+        p.drawString(360, y, f"Rs. {item.price:.2f}")
+        p.drawString(450, y, f"Rs. {line_total:.2f}")
+        y -= 20
+
+        if y < 150:
+            p.showPage()
+            y = height - 100
+
+    # ===== TOTALS =====
+    y -= 10
+    p.line(50, y, width-50, y)
+
+    tax = subtotal * Decimal("0.18")
+    grand_total = subtotal + tax
+
+    y -= 30
+    p.setFont("Helvetica", 11)
+    p.drawRightString(430, y, "Subtotal:")
+    p.drawRightString(width-50, y, f"Rs. {subtotal:.2f}")
+
+    y -= 20
+    p.drawRightString(430, y, "GST (18%):")
+    p.drawRightString(width-50, y, f"Rs. {tax:.2f}")
+
+    y -= 25
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(430, y, "Grand Total:")
+    p.drawRightString(width-50, y, f"Rs. {grand_total:.2f}")
+
+    # ===== FOOTER =====
+    y -= 60
+    p.setFont("Helvetica", 10)
+    p.setFillColor(colors.grey)
+    p.drawString(50, y, "Thank you for your purchase!")
+    y -= 14
+    p.drawString(50, y, "For support, contact support@shophub.com")
+
+    p.showPage()
+    p.save()
+
+    return buffer.getvalue()
+
+
+def invoice_version(order):
+    """Hash of the order fields and item lines that appear on the invoice"""
+    lines = order.items.order_by('id').values_list('product__name', 'quantity', 'price')
+    data = [
+        order.id, order.first_name, order.last_name, order.phone,
+        order.address, order.city, order.state, order.postal_code,
+        order.created_at.strftime('%d-%m-%Y'),
+        [[name, quantity, str(price)] for name, quantity, price in lines],
+    ]
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+def invoice_path(sha256):
+    return f"invoices/{sha256[:2]}/{sha256}.pdf"
+
+
+def get_invoice(order):
+    """
+    Make sure the current version of the order's invoice is stored and return
+    its storage path. Renders only when the version changed or the file is gone.
+    """
+    version = invoice_version(order)
+    if order.invoice_version == version and order.invoice_sha256:
+        path = invoice_path(order.invoice_sha256)
+        if default_storage.exists(path):
+            return path
+
+    pdf = render_invoice_pdf(order)
+    sha256 = hashlib.sha256(pdf).hexdigest()
+    path = invoice_path(sha256)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(pdf))
+
+    order.invoice_version = version
+    order.invoice_sha256 = sha256
+    order.invoice_rendered_at = timezone.now()
+    # .update() so bookkeeping does not bump Order.updated_at
+    type(order).objects.filter(pk=order.pk).update(
+        invoice_version=version,
+        invoice_sha256=sha256,
+        invoice_rendered_at=order.invoice_rendered_at,
+    )
+    return path
+
+
+def get_invoice_pdf(order):
+    """Stored invoice bytes for an order"""
+    with default_storage.open(get_invoice(order), 'rb') as f:
+        return f.read()
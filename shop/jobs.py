@@ -0,0 +1,135 @@
+"""
+Database-backed background job queue.
+
+Jobs are rows in shop_job. Enqueue them inside the same transaction as the
+data they act on: workers only see them once that transaction commits, and
+a rollback discards them together with the order. The `run_jobs` command
+claims due jobs (SKIP LOCKED where the database supports it) and runs them
+on a thread pool. Failures are retried with exponential backoff.
+
+Handlers are registered with @task('name') and receive the job payload as
+keyword arguments.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 30          # seconds before the first retry
+BACKOFF_MAX = 60 * 60      # never wait more than an hour between attempts
+STALE_AFTER = timedelta(minutes=15)
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as the handler for jobs called `name`"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=5):
+    """
+    Queue a job. When SHOP_JOBS_EAGER is set (local runs without a worker)
+    the job is run in-process as soon as the surrounding transaction commits.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown job: {name}")
+
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if getattr(settings, 'SHOP_JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_job(job.id))
+    return job
+
+
+def enqueue_once(name, payload=None, **options):
+    """enqueue() unless a job with the same name and payload is already queued or running"""
+    pending = Job.objects.filter(name=name, payload=payload or {}, status__in=('queued', 'running'))
+    if pending.exists():
+        return None
+    return enqueue(name, payload, **options)
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts`, with 10% jitter"""
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def claim_jobs(limit):
+    """Mark up to `limit` due jobs as running and return their ids"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            Job.objects.filter(id__in=ids, status='queued').update(status='running', locked_at=now)
+    return ids
+
+
+def requeue_stale_jobs():
+    """Put back jobs whose worker died mid-run; fail those out of attempts"""
+    stale = Job.objects.filter(status='running', locked_at__lt=timezone.now() - STALE_AFTER)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_at=None, last_error='Worker died while running the job',
+    )
+    return stale.update(status='queued', locked_at=None)
+
+
+def run_job(job_id):
+    """Run one claimed job and record the outcome"""
+    # Count the attempt before running it, so a job that takes its worker
+    # down with it still uses up its attempts
+    Job.objects.filter(id=job_id).update(attempts=F('attempts') + 1, updated_at=timezone.now())
+    job = Job.objects.get(id=job_id)
+    handler = _registry.get(job.name)
+
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job.name!r}")
+        handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning("Job #%s %s failed, retrying at %s", job.id, job.name, job.run_at)
+        else:
+            job.status = 'failed'
+            logger.error("Job #%s %s failed permanently", job.id, job.name)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_at', 'last_error', 'updated_at'])
+    return job
+
+
+def run_job_in_thread(job_id):
+    """Pool entry point: each worker thread owns its own DB connection"""
+    try:
+        return run_job(job_id)
+    finally:
+        connection.close()
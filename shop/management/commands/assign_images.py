@@ -1,13 +1,22 @@
 import os
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
+from django.core.files import File
+from django.utils import timezone
+from shop import covers, fragments, jobs, renditions
 from shop.models import Product
+from shop.storage import image_storage
 
 
 class Command(BaseCommand):
     help = 'Assign random images to products based on their category'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Threads used to hash and store source images')
+
     def handle(self, *args, **options):
         # Map category names to image folders
         category_images = {
@@ -67,50 +76,71 @@ class Command(BaseCommand):
             ],
         }
         
-        media_root = 'media/products'
-        total_assigned = 0
-        
-        # Get all products
-        products = Product.objects.all()
+        media_root = os.path.join(settings.MEDIA_ROOT, 'products')
+        started = time.perf_counter()
         
         print("\n" + "="*60)
         print("ASSIGNING IMAGES TO PRODUCTS")
         print("="*60 + "\n")
         
+        # Pick an image for every product first
+        products = list(Product.objects.select_related('category'))
+        picks = {}
         for product in products:
-            # Get category name
-            category_name = product.category.name.lower()
+            category_name = product.category.name.lower() if product.category else ''
             
             # Skip if no images for this category
             if category_name not in category_images:
                 print(f"❌ No images found for category: {category_name}")
                 continue
             
-            # Get random image from category
-            image_list = category_images[category_name]
-            random_image = random.choice(image_list)
-            
-            # Build path to image
-            image_path = os.path.join(media_root, category_name, random_image)
-            
+            random_image = random.choice(category_images[category_name])
+            picks[product] = os.path.join(media_root, category_name, random_image)
+        
+        # Store each distinct source file once. The storage names files by
+        # content hash, so files already in media are not copied again.
+        def store(image_path):
             try:
-                # Read image file
                 with open(image_path, 'rb') as f:
-                    image_content = f.read()
-                
-                # Assign to product
-                product.image.save(random_image, ContentFile(image_content), save=True)
-                
-                print(f"✅ {product.name:40} → {random_image[:45]}")
-                total_assigned += 1
-                
-            except FileNotFoundError:
-                print(f"⚠️  File not found: {image_path}")
+                    return image_path, image_storage.save(f"products/{os.path.basename(image_path)}", File(f)), None
             except Exception as e:
-                print(f"❌ Error assigning image to {product.name}: {str(e)}")
+                return image_path, None, e
+        
+        stored = {}
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for image_path, name, error in pool.map(store, sorted(set(picks.values()))):
+                if error is None:
+                    stored[image_path] = name
+                elif isinstance(error, FileNotFoundError):
+                    print(f"⚠️  File not found: {image_path}")
+                else:
+                    print(f"❌ Error storing {image_path}: {str(error)}")
+        
+        # Point products at the stored files; no per-product copies or saves.
+        # bulk_update skips auto_now, and the API's ETag and Last-Modified
+        # come from updated_at, so stamp it here.
+        assigned = []
+        now = timezone.now()
+        for product, image_path in picks.items():
+            if image_path in stored:
+                product.image = stored[image_path]
+                product.updated_at = now
+                assigned.append(product)
+        Product.objects.bulk_update(assigned, ['image', 'updated_at'], batch_size=500)
+        total_assigned = len(assigned)
+        
+        # bulk_update skips post_save, so refresh covers and cached grids and
+        # queue the thumbnails here
+        covers.invalidate_category_covers()
+        fragments.bump_generation('products')
+        for name in set(stored.values()):
+            if not renditions.available_widths(name):
+                jobs.enqueue_once('generate_renditions', {'name': name})
         
+        elapsed = time.perf_counter() - started
         print("\n" + "="*60)
-        print(f"✅ Successfully assigned {total_assigned} images!")
+        print(f"✅ Successfully assigned {total_assigned} images "
+              f"({len(stored)} distinct files) in {elapsed:.2f}s!")
         print("="*60 + "\n")
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from shop.models import Product, Cart, CartItem, EmailOutbox, Order, OrderItem, Job
+from shop.orders import place_order
+
+
+CHECKOUT_DETAILS = {
+    'first_name': 'Bench',
+    'last_name': 'Buyer',
+    'email': 'bench@example.com',
+    'phone': '9999999999',
+    'address': '1 Load Test Road',
+    'city': 'Pune',
+    'state': 'MH',
+    'postal_code': '411001',
+    'payment_method': 'cod',
+}
+
+
+class Command(BaseCommand):
+    help = 'Fire parallel checkouts at one hot product and report orders/sec and oversell'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200, help='Number of concurrent buyers')
+        parser.add_argument('--stock', type=int, default=50, help='Starting stock of the hot product')
+        parser.add_argument('--quantity', type=int, default=1, help='Units each buyer orders')
+        parser.add_argument('--threads', type=int, default=16, help='Parallel checkout threads')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users, orders and product')
+
+    def handle(self, *args, **options):
+        buyers = options['buyers']
+        stock = options['stock']
+        quantity = options['quantity']
+        prefix = f"bench_{int(time.time())}"
+
+        self.stdout.write(f"Setting up {buyers} buyers for a hot product with stock {stock}...")
+        product = Product.objects.create(
+            name=f"{prefix} hot item",
+            description='Checkout benchmark product',
+            price=Decimal('100.00'),
+            stock=stock,
+        )
+        users = User.objects.bulk_create([User(username=f"{prefix}_{i}") for i in range(buyers)])
+        users = list(User.objects.filter(username__startswith=f"{prefix}_"))
+        carts = Cart.objects.bulk_create([Cart(user=user, session_key=prefix[:40]) for user in users])
+        carts = list(Cart.objects.filter(user__in=users).select_related('user'))
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=quantity) for cart in carts])
+
+        def checkout(cart):
+            try:
+                result = place_order(cart.user, cart, CHECKOUT_DETAILS)
+                return 'ok' if result.ok else 'out_of_stock'
+            except Exception as e:
+                return f'error: {e}'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            outcomes = list(pool.map(checkout, carts))
+        elapsed = time.perf_counter() - started
+
+        placed = outcomes.count('ok')
+        rejected = outcomes.count('out_of_stock')
+        errors = [outcome for outcome in outcomes if outcome.startswith('error')]
+
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).count() * quantity
+        oversell = max(sold - stock, 0) + max(-product.stock, 0)
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Checkouts attempted : {buyers}")
+        self.stdout.write(f"Orders placed       : {placed}")
+        self.stdout.write(f"Out of stock        : {rejected}")
+        self.stdout.write(f"Errors              : {len(errors)}")
+        self.stdout.write(f"Elapsed             : {elapsed:.2f}s")
+        self.stdout.write(f"Orders/sec          : {placed / elapsed if elapsed else 0:.1f}")
+        self.stdout.write(f"Units sold          : {sold} of {stock}")
+        self.stdout.write(f"Final stock         : {product.stock}")
+        self.stdout.write("=" * 60)
+        for error in sorted(set(errors))[:5]:
+            self.stdout.write(self.style.WARNING(error))
+
+        if oversell:
+            self.stdout.write(self.style.ERROR(f"OVERSOLD by {oversell} units"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No oversell"))
+
+        if not options['keep']:
+            orders = Order.objects.filter(user__in=users)
+            order_ids = list(orders.values_list('id', flat=True))
+            outbox_ids = list(EmailOutbox.objects.filter(order_id__in=order_ids).values_list('id', flat=True))
+            # Invoice jobs carry the order id, email deliveries the outbox id
+            Job.objects.filter(payload__order_id__in=order_ids).delete()
+            Job.objects.filter(payload__outbox_id__in=outbox_ids).delete()
+            orders.delete()
+            User.objects.filter(username__startswith=f"{prefix}_").delete()
+            product.delete()
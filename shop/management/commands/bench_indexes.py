@@ -0,0 +1,104 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from shop.forms import OrderFilterForm
+from shop.models import Cart, Category, Order, Product
+from shop.pagination import encode_cursor, paginate
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries behind the catalog, order and cart views and fail if they stop using their indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=20000, help='Seed perf data first when there are fewer orders than this')
+        parser.add_argument('--no-seed', action='store_true', help='Use the data already in the database')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (best is reported)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failing ones')
+
+    def handle(self, *args, **options):
+        if not options['no_seed'] and Order.objects.count() < options['orders']:
+            self.stdout.write(f"Seeding {options['orders']} orders with seed_perf_data...")
+            # Replace any smaller earlier seed; its categories would collide
+            call_command(
+                'seed_perf_data', orders=options['orders'], products=options['orders'] // 2,
+                users=max(options['orders'] // 20, 10), carts=500, guest_carts=500, flush=True,
+                stdout=self.stdout,
+            )
+        # Planner statistics must reflect the data or the plans mean nothing
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        failures = 0
+        self.stdout.write(f"{'CASE':<34} {'BEST MS':>8}  INDEX")
+        for label, expected_index, run in self.cases():
+            queries = self.capture(run)
+            plan = '\n'.join(self.explain(sql) for sql in queries)
+            best = self.best_time(run, options['repeat'])
+            ok = expected_index in plan
+            failures += not ok
+            status = self.style.SUCCESS('ok') if ok else self.style.ERROR('NOT USED')
+            self.stdout.write(f"{label:<34} {best:>8.2f}  {expected_index} {status}")
+            if not ok or options['verbose_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+
+        if failures:
+            raise CommandError(f"{failures} queries no longer use their index")
+        self.stdout.write(self.style.SUCCESS('All queries use their indexes.'))
+
+    def cases(self):
+        """(label, index the plan must mention, callable running the view's queries)"""
+        category = Category.objects.annotate(n=Count('products')).order_by('-n').first()
+        buyer_id = Order.objects.values_list('user_id', flat=True).order_by('-created_at').first()
+        if category is None or buyer_id is None:
+            raise CommandError('Need products and orders; run without --no-seed')
+        products = Product.objects.select_related('category')
+        middle = products.order_by('-created_at', '-id')[products.count() // 2]
+        user_carts = Cart.objects.filter(user__isnull=False).values_list('user_id', flat=True)
+        cart_user_id = user_carts.first() or buyer_id
+
+        def admin_orders(**filters):
+            form = OrderFilterForm(filters)
+            return lambda: paginate(form.filter(Order.objects.all()), page_size=50)
+
+        return [
+            ('product_list', 'shop_product_created_idx', lambda: paginate(products)),
+            ('product_list (deep page)', 'shop_product_created_idx',
+             lambda: paginate(products, after=encode_cursor(middle))),
+            ('category_detail', 'shop_product_cat_created_idx',
+             lambda: paginate(products.filter(category=category))),
+            ('my_orders', 'shop_order_user_created_idx',
+             lambda: paginate(Order.objects.filter(user_id=buyer_id).with_totals(), page_size=10)),
+            ('user_profile (order count)', 'shop_order_user_created_idx',
+             lambda: Order.objects.filter(user_id=buyer_id).count()),
+            ('admin_orders', 'shop_order_created_idx', admin_orders()),
+            ('admin_orders ?status=pending', 'shop_order_status_created_idx', admin_orders(status='pending')),
+            ('admin_orders ?date_from=&date_to=', 'shop_order_created_idx',
+             admin_orders(date_from=middle.created_at.date(), date_to=middle.created_at.date())),
+            ('cart by user', 'shop_cart_user_id',
+             lambda: list(Cart.objects.filter(user_id=cart_user_id))),
+            ('guest cart by session', 'shop_cart_guest_session_idx',
+             lambda: list(Cart.objects.filter(session_key='bench', user__isnull=True))),
+        ]
+
+    def capture(self, run):
+        with CaptureQueriesContext(connection) as context:
+            run()
+        return [query['sql'] for query in context.captured_queries]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+    def best_time(self, run, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
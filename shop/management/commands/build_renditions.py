@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from shop import renditions
+from shop.models import Category, Product
+
+
+THUMBNAIL_WIDTH = 320
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG renditions for existing product and category images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render renditions that already exist')
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in (Product, Category):
+            names.update(
+                model.objects.exclude(image__isnull=True).exclude(image='').values_list('image', flat=True)
+            )
+        names = sorted(name for name in names if default_storage.exists(name))
+        self.stdout.write(f"Rendering {len(names)} images...")
+
+        def render(name):
+            try:
+                return name, renditions.generate_renditions(name, force=options['force']), None
+            except Exception as e:
+                return name, [], e
+
+        original_bytes = thumbnail_bytes = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for name, widths, error in pool.map(render, names):
+                if error:
+                    self.stdout.write(self.style.ERROR(f"{name}: {error}"))
+                    continue
+                original_bytes += default_storage.size(name)
+                if widths:
+                    # What a catalog card downloads instead of the original
+                    card_width = THUMBNAIL_WIDTH if THUMBNAIL_WIDTH in widths else widths[-1]
+                    thumbnail_bytes += default_storage.size(renditions.rendition_name(name, card_width, 'webp'))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Renditions ready for {len(names)} images '
+                f'(originals {original_bytes / 1024 / 1024:.1f} MB, '
+                f'{THUMBNAIL_WIDTH}px WebP thumbnails {thumbnail_bytes / 1024:.0f} KB).'
+            )
+        )
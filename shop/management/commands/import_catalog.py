@@ -0,0 +1,160 @@
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from shop import covers, fragments, search
+from shop.models import Category, Product
+
+
+# Images are not imported: they are assigned through media storage
+# (assign_images / admin), so a feed can never point a product at a missing file.
+UPDATE_FIELDS = ['description', 'price', 'stock', 'category', 'updated_at']
+PRICE_FIELD = Product._meta.get_field('price')
+PRICE_STEP = Decimal(1).scaleb(-PRICE_FIELD.decimal_places)
+
+
+class Command(BaseCommand):
+    help = 'Stream products from a CSV or JSONL feed (file or "-" for stdin) and upsert them by name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file, or - to read stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Feed format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products upserted per statement')
+        parser.add_argument('--no-create-categories', action='store_true', help='Skip rows whose category does not exist')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if path == '-' and not options['format']:
+            raise CommandError('Pass --format when reading from stdin')
+
+        self.batch_size = options['batch_size']
+        self.create_categories = not options['no_create_categories']
+        # Every existing category is looked up once, by slug and by name
+        self.categories = {}
+        for category in Category.objects.only('id', 'name', 'slug'):
+            self.categories[category.slug] = category.id
+            self.categories[category.name.lower()] = category.id
+
+        self.imported = self.skipped = 0
+        self.started = time.perf_counter()
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            rows = csv.DictReader(stream) if fmt == 'csv' else self.read_jsonl(stream)
+            batch = {}
+            for line, row in enumerate(rows, start=1):
+                product = self.build_product(line, row)
+                if product is None:
+                    continue
+                # Last row wins when a feed repeats a name
+                batch[product.name] = product
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = {}
+            if batch:
+                self.flush(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Bulk writes bypass the product signals
+        fragments.bump_generation('products')
+        covers.invalidate_category_covers()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {self.imported} products ({self.skipped} skipped) in {elapsed:.1f}s '
+                f'- {self.imported / elapsed if elapsed else 0:.0f} rows/sec.'
+            )
+        )
+
+    def read_jsonl(self, stream):
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+    def skip(self, line, reason):
+        self.skipped += 1
+        if self.skipped <= 20:
+            self.stdout.write(self.style.WARNING(f"Row {line}: {reason}"))
+
+    def build_product(self, line, row):
+        if not isinstance(row, dict):
+            return self.skip(line, 'not a JSON object')
+        name = (row.get('name') or '').strip()
+        if not name:
+            return self.skip(line, 'missing name')
+        try:
+            price = Decimal(str(row.get('price', '')).strip())
+            stock = int(row.get('stock') or 0)
+            if not price.is_finite():
+                return self.skip(line, 'bad price or stock')
+            # Anything Product.price cannot hold would fail the whole batch
+            stored = price.quantize(PRICE_STEP)
+        except (InvalidOperation, ValueError):
+            return self.skip(line, 'bad price or stock')
+        if stored != price or len(stored.as_tuple().digits) > PRICE_FIELD.max_digits:
+            return self.skip(line, f'price {price} does not fit {PRICE_FIELD.max_digits},{PRICE_FIELD.decimal_places}')
+        if price < 0 or stock < 0:
+            return self.skip(line, 'negative price or stock')
+
+        category_id = None
+        category = (row.get('category') or '').strip()
+        if category:
+            category_id = self.resolve_category(category)
+            if category_id is None:
+                return self.skip(line, f'unknown category {category!r}')
+
+        return Product(
+            name=name[:255],
+            description=row.get('description') or '',
+            price=price,
+            stock=stock,
+            category_id=category_id,
+        )
+
+    def resolve_category(self, value):
+        key = value.lower()
+        if key in self.categories:
+            return self.categories[key]
+        slug = slugify(value)
+        if slug in self.categories:
+            self.categories[key] = self.categories[slug]
+            return self.categories[key]
+        if not self.create_categories or not slug:
+            return None
+        category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': value[:100]})
+        self.categories[key] = self.categories[slug] = category.id
+        return category.id
+
+    def flush(self, batch):
+        now = timezone.now()
+        products = list(batch.values())
+        for product in products:
+            product.updated_at = now
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=UPDATE_FIELDS,
+            )
+            ids = Product.objects.filter(name__in=batch).values_list('id', flat=True)
+            search.index_products(ids)
+
+        self.imported += len(products)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"  {self.imported} rows ({self.imported / elapsed:.0f} rows/sec)")
@@ -0,0 +1,87 @@
+import re
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from shop import profiling
+
+
+class Command(BaseCommand):
+    help = 'List captured request profiles, or summarize one (hot functions, slowest and repeated SQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to summarize (default: list them)')
+        parser.add_argument('--limit', type=int, default=20, help='Rows shown per list or table')
+        parser.add_argument('--view', help='Only list profiles of this view name')
+        parser.add_argument('--clear', action='store_true', help='Delete every saved profile')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            profiles = profiling.list_profiles()
+            for meta in profiles:
+                profiling.delete_profile(meta['id'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {len(profiles)} profiles."))
+        elif options['profile_id']:
+            self.summarize(options['profile_id'], options['limit'])
+        else:
+            self.show_list(options['view'], options['limit'])
+
+    def show_list(self, view, limit):
+        profiles = [meta for meta in profiling.list_profiles() if not view or meta['view'] == view]
+        if not profiles:
+            self.stdout.write(f"No profiles in {profiling.get_config()['DIR']}.")
+            return
+        self.stdout.write(f"{'ID':<23} {'WHEN':<19} {'VIEW':<24} {'STATUS':>6} {'MS':>8} {'SQL':>5} {'SQL MS':>8}  TRIGGER")
+        for meta in profiles[:limit]:
+            when = datetime.fromtimestamp(meta['time']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{meta['id']:<23} {when:<19} {meta['view'][:24]:<24} {meta['status']:>6} "
+                f"{meta['duration_ms']:>8.1f} {meta['sql_count']:>5} {meta['sql_ms']:>8.1f}  {meta['trigger']}"
+            )
+        if len(profiles) > limit:
+            self.stdout.write(f"... {len(profiles) - limit} more (--limit)")
+
+    def summarize(self, profile_id, limit):
+        meta = next((meta for meta in profiling.list_profiles() if meta['id'] == profile_id), None)
+        if meta is None:
+            raise CommandError(f"No profile {profile_id!r}")
+        stacks = profiling.load_stacks(profile_id)
+        samples = sum(stacks.values()) or 1
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{meta['method']} {meta['path']} -> {meta['status']} ({meta['view']})"))
+        self.stdout.write(
+            f"{meta['duration_ms']:.1f} ms, {meta['sql_count']} queries in {meta['sql_ms']:.1f} ms, "
+            f"{meta['samples']} samples every {meta['interval_ms']:g} ms"
+        )
+
+        # Self time: the innermost frame of each sample. Total time: every
+        # frame on the stack, counted once per sample.
+        own, total = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        self.table('Hottest frames (self)', own, samples, limit)
+        self.table('Hottest frames (total)', total, samples, limit)
+
+        queries = meta['sql']
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest SQL'))
+        for query in sorted(queries, key=lambda q: q['ms'], reverse=True)[:limit]:
+            self.stdout.write(f"  {query['ms']:>8.2f} ms  {query['sql'][:160]}")
+
+        # Same statement shape run again and again usually means an N+1
+        shapes = Counter(re.sub(r'\b\d+\b', '?', query['sql']) for query in queries)
+        repeated = [(sql, count) for sql, count in shapes.most_common(limit) if count > 1]
+        if repeated:
+            self.stdout.write(self.style.MIGRATE_HEADING('Repeated SQL'))
+            for sql, count in repeated:
+                self.stdout.write(f"  {count:>5}x  {sql[:160]}")
+
+        folded = f"{profiling.get_config()['DIR']}/{profile_id}.folded"
+        self.stdout.write(f"\nFlame graph: flamegraph.pl {folded} > {profile_id}.svg (or open it in speedscope)")
+
+    def table(self, title, counter, samples, limit):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for frame, count in counter.most_common(limit):
+            self.stdout.write(f"  {count / samples:>6.1%}  {frame}")
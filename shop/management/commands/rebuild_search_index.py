@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from shop import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all products'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        self.stdout.write(f"Rebuilding search index ({backend.__class__.__name__})...")
+
+        count = search.rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Search index rebuilt for {count} products.')
+        )
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from shop import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (invoice PDFs, confirmation emails)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the due jobs and exit')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f"Job worker started with {workers} threads")
+
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    jobs.requeue_stale_jobs()
+                    job_ids = jobs.claim_jobs(options['batch_size'])
+
+                    if not job_ids:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    for job in pool.map(jobs.run_job_in_thread, job_ids):
+                        if job.status == 'done':
+                            done += 1
+                        elif job.status == 'failed':
+                            failed += 1
+                            self.stdout.write(self.style.ERROR(f"Job #{job.id} {job.name} failed"))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping job worker...")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Jobs finished: {done} done, {failed} failed.')
+        )
@@ -0,0 +1,215 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
+from faker import Faker
+from shop import covers, fragments, search
+from shop.models import TAX_RATE, Cart, CartItem, Category, Order, OrderItem, Product
+
+
+USER_PREFIX = 'perf_'
+CATEGORY_PREFIX = 'perf-'
+GUEST_SESSION_PREFIX = 'perf-guest-'
+BATCH_SIZE = 1000
+
+STATUS_WEIGHTS = {'delivered': 60, 'shipped': 12, 'confirmed': 8, 'pending': 15, 'cancelled': 5}
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, skewed, reproducible dataset (users, catalog, carts, orders) for performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--categories', type=int, default=40)
+        parser.add_argument('--products', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=2000, help='Users that get an open cart')
+        parser.add_argument('--guest-carts', type=int, default=500, help='Session-keyed carts left over from before cookie carts')
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--max-lines', type=int, default=5, help='Most lines in one order or cart')
+        parser.add_argument('--days', type=int, default=365, help='Spread orders and products over this many days')
+        parser.add_argument('--hot-skew', type=float, default=1.1, help='Zipf exponent for product popularity')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--flush', action='store_true', help='Delete previously seeded data first')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('en_IN')
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+
+        if options['flush']:
+            self.stage('Flushing previous seed data', self.flush)
+
+        categories = self.stage('Categories', self.seed_categories)
+        products = self.stage('Products', self.seed_products, categories)
+        users = self.stage('Users', self.seed_users)
+
+        # Popularity: a few products and a few customers account for most orders
+        product_weights = list(accumulate(1 / (rank + 1) ** options['hot_skew'] for rank in range(len(products))))
+        self.rng.shuffle(products)
+        # Repeat buyers: Pareto-distributed order rates, capped so one account
+        # cannot take over the whole order history
+        buyer_weights = list(accumulate(min(self.rng.paretovariate(1.5), 50) for _ in users))
+
+        self.stage('Carts', self.seed_carts, users, products, product_weights)
+        self.stage('Guest carts', self.seed_guest_carts)
+        self.stage('Orders', self.seed_orders, users, buyer_weights, products, product_weights)
+
+        self.stage('Search index', search.rebuild_index)
+        fragments.bump_generation('categories', 'products')
+        covers.invalidate_category_covers()
+
+        self.stdout.write(self.style.SUCCESS('Seed data ready.'))
+
+    def stage(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        count = len(result) if isinstance(result, (list, dict)) else result
+        self.stdout.write(f"{label}: {count} in {time.perf_counter() - started:.1f}s")
+        return result
+
+    def spread(self, days):
+        """A time in the last `days` days, weighted towards recent ones"""
+        return self.now - timedelta(seconds=int(self.rng.random() ** 2 * days * 86400))
+
+    def flush(self):
+        deleted = User.objects.filter(username__startswith=USER_PREFIX).delete()[0]
+        deleted += Cart.objects.filter(session_key__startswith=GUEST_SESSION_PREFIX, user__isnull=True).delete()[0]
+        try:
+            deleted += Category.objects.filter(slug__startswith=CATEGORY_PREFIX).delete()[0]
+        except ProtectedError:
+            self.stdout.write(self.style.WARNING('Seeded products are referenced by real orders; kept them.'))
+        return deleted
+
+    def seed_categories(self):
+        kinds = ['Gear', 'Wear', 'Home', 'Tech', 'Care']
+        categories = [
+            Category(
+                name=f"{self.fake.word().title()} {self.rng.choice(kinds)} {i}"[:100],
+                slug=f"{CATEGORY_PREFIX}{i}",
+                description=self.fake.sentence(),
+            )
+            for i in range(self.options['categories'])
+        ]
+        return Category.objects.bulk_create(categories, batch_size=BATCH_SIZE)
+
+    def seed_products(self, categories):
+        # Category sizes are skewed too: a few big categories, a long tail
+        category_weights = list(accumulate(1 / (rank + 1) for rank in range(len(categories))))
+        products = []
+        for i in range(self.options['products']):
+            products.append(Product(
+                name=f"{self.fake.catch_phrase()} #{i}"[:255],
+                description=self.fake.paragraph(nb_sentences=3),
+                price=Decimal(self.rng.lognormvariate(7, 1.2)).quantize(Decimal('0.01')),
+                stock=0 if self.rng.random() < 0.1 else self.rng.randint(1, 500),
+                category=self.rng.choices(categories, cum_weights=category_weights)[0],
+            ))
+        created = []
+        for start in range(0, len(products), BATCH_SIZE):
+            with transaction.atomic():
+                chunk = Product.objects.bulk_create(products[start:start + BATCH_SIZE])
+                # auto_now_add ignores preset values, so backdate afterwards
+                for product in chunk:
+                    product.created_at = self.spread(self.options['days'])
+                Product.objects.bulk_update(chunk, ['created_at'])
+            created.extend(chunk)
+        return created
+
+    def seed_users(self):
+        password = make_password('perf-password')
+        users = []
+        for i in range(self.options['users']):
+            first, last = self.fake.first_name(), self.fake.last_name()
+            users.append(User(
+                username=f"{USER_PREFIX}{i}",
+                first_name=first[:150],
+                last_name=last[:150],
+                email=f"{USER_PREFIX}{i}@example.com",
+                password=password,
+            ))
+        return User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+    def pick_lines(self, products, product_weights):
+        """[(product, quantity)] for one cart or order; small baskets are most common"""
+        sizes = range(1, self.options['max_lines'] + 1)
+        count = self.rng.choices(sizes, weights=[1 / size for size in sizes])[0]
+        lines = {}
+        for product in self.rng.choices(products, cum_weights=product_weights, k=count):
+            lines[product.id] = (product, lines.get(product.id, (product, 0))[1] + self.rng.randint(1, 3))
+        return lines.values()
+
+    def seed_carts(self, users, products, product_weights):
+        owners = self.rng.sample(users, min(self.options['carts'], len(users)))
+        carts = Cart.objects.bulk_create(
+            [Cart(user=user, session_key='') for user in owners], batch_size=BATCH_SIZE,
+        )
+        items = [
+            CartItem(cart=cart, product=product, quantity=quantity)
+            for cart in carts
+            for product, quantity in self.pick_lines(products, product_weights)
+        ]
+        CartItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        return carts
+
+    def seed_guest_carts(self):
+        carts = [Cart(session_key=f"{GUEST_SESSION_PREFIX}{i}") for i in range(self.options['guest_carts'])]
+        return Cart.objects.bulk_create(carts, batch_size=BATCH_SIZE)
+
+    def seed_orders(self, users, buyer_weights, products, product_weights):
+        # Faker is slow per call; draw contact details from fixed pools
+        addresses = [
+            (self.fake.street_address()[:255], self.fake.city()[:50], self.fake.state()[:50], self.fake.postcode()[:10])
+            for _ in range(500)
+        ]
+        phones = [self.fake.msisdn()[:20] for _ in range(500)]
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        total = 0
+        remaining = self.options['orders']
+        while remaining > 0:
+            size = min(BATCH_SIZE, remaining)
+            buyers = self.rng.choices(users, cum_weights=buyer_weights, k=size)
+            orders, order_lines = [], []
+            for user in buyers:
+                lines = list(self.pick_lines(products, product_weights))
+                subtotal = sum((product.price * quantity for product, quantity in lines), Decimal('0.00'))
+                address, city, state, postal_code = self.rng.choice(addresses)
+                orders.append(Order(
+                    user=user,
+                    first_name=user.first_name[:50],
+                    last_name=user.last_name[:50],
+                    email=user.email,
+                    phone=self.rng.choice(phones),
+                    address=address,
+                    city=city,
+                    state=state,
+                    postal_code=postal_code,
+                    total_amount=(subtotal * (1 + TAX_RATE)).quantize(Decimal('0.01')),
+                    payment_method='cod',
+                    status=self.rng.choices(statuses, weights=status_weights)[0],
+                ))
+                order_lines.append(lines)
+
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                for order in orders:
+                    order.created_at = self.spread(self.options['days'])
+                Order.objects.bulk_update(orders, ['created_at'])
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=product, quantity=quantity, price=product.price)
+                    for order, lines in zip(orders, order_lines)
+                    for product, quantity in lines
+                ], batch_size=BATCH_SIZE)
+
+            total += size
+            remaining -= size
+        return total
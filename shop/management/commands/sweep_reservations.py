@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from shop import reservations
+
+
+class Command(BaseCommand):
+    help = 'Delete expired stock reservations in small batches (run from cron, or with --interval as a loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+        parser.add_argument('--interval', type=float, default=0, help='Keep sweeping every N seconds (0: sweep once and exit)')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                # Small batches keep each DELETE short, so add-to-cart and
+                # checkout never queue behind the sweeper
+                while True:
+                    deleted = reservations.sweep(options['batch_size'])
+                    total += deleted
+                    if deleted < options['batch_size']:
+                        break
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping reservation sweeper...")
+
+        self.stdout.write(self.style.SUCCESS(f'Expired reservations removed: {total}.'))
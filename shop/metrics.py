@@ -0,0 +1,189 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+MetricsMiddleware records, for every request, the resolved URL name, status,
+latency, number and time of SQL queries (via connection.execute_wrapper) and
+response size. Each process keeps its numbers in memory and writes a
+snapshot to SHOP_METRICS_DIR/<pid>.json at most once a second. The /metrics
+endpoint adds up the snapshots of every gunicorn worker, the same way
+prometheus_client's multiprocess mode does.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .caching import shop_cache
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_INTERVAL = 1.0
+
+
+def metrics_dir():
+    return getattr(settings, 'SHOP_METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'shophub-metrics')
+
+
+def new_view_stats():
+    return {
+        'requests': {},                         # status code -> count
+        'buckets': [0] * len(LATENCY_BUCKETS),  # cumulative is built when rendering
+        'latency_sum': 0.0,
+        'count': 0,
+        'sql_queries': 0,
+        'sql_seconds': 0.0,
+        'response_bytes': 0,
+    }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(new_view_stats)
+        self.last_flush = 0.0
+
+    def record(self, view, status, seconds, queries, sql_seconds, size):
+        with self.lock:
+            stats = self.views[view]
+            status = str(status)
+            stats['requests'][status] = stats['requests'].get(status, 0) + 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['buckets'][i] += 1
+                    break
+            stats['count'] += 1
+            stats['latency_sum'] += seconds
+            stats['sql_queries'] += queries
+            stats['sql_seconds'] += sql_seconds
+            stats['response_bytes'] += size
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            views = json.loads(json.dumps(self.views))
+        return {'views': views, 'cache': shop_cache.stats()}
+
+    def flush(self):
+        """Write this process's totals where /metrics in any worker can read them"""
+        self.last_flush = time.monotonic()
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """execute_wrapper that counts and times every SQL statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unresolved'
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        registry.record(view, response.status_code, seconds, timer.count, timer.seconds, size)
+        return response
+
+
+def collect():
+    """Sum the snapshots written by every worker process"""
+    registry.flush()
+    views = defaultdict(new_view_stats)
+    cache = defaultdict(int)
+    directory = metrics_dir()
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for view, stats in snapshot.get('views', {}).items():
+            total = views[view]
+            for status, count in stats['requests'].items():
+                total['requests'][status] = total['requests'].get(status, 0) + count
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+            for key in ('count', 'latency_sum', 'sql_queries', 'sql_seconds', 'response_bytes'):
+                total[key] += stats[key]
+        for event, count in snapshot.get('cache', {}).items():
+            cache[event] += count
+    return views, cache
+
+
+def render_prometheus():
+    views, cache = collect()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    def label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+    family('shop_http_requests_total', 'counter', 'Requests by view and status code.')
+    for view, stats in sorted(views.items()):
+        for status, count in sorted(stats['requests'].items()):
+            lines.append(f'shop_http_requests_total{{view="{label(view)}",status="{status}"}} {count}')
+
+    family('shop_http_request_duration_seconds', 'histogram', 'Request latency by view.')
+    for view, stats in sorted(views.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+            cumulative += count
+            lines.append(f'shop_http_request_duration_seconds_bucket{{view="{label(view)}",le="{bound}"}} {cumulative}')
+        lines.append(f'shop_http_request_duration_seconds_bucket{{view="{label(view)}",le="+Inf"}} {stats["count"]}')
+        lines.append(f'shop_http_request_duration_seconds_sum{{view="{label(view)}"}} {stats["latency_sum"]:.6f}')
+        lines.append(f'shop_http_request_duration_seconds_count{{view="{label(view)}"}} {stats["count"]}')
+
+    for name, key, help_text, fmt in (
+        ('shop_sql_queries_total', 'sql_queries', 'SQL statements executed by view.', '{}'),
+        ('shop_sql_duration_seconds_total', 'sql_seconds', 'Time spent in SQL by view.', '{:.6f}'),
+        ('shop_http_response_bytes_total', 'response_bytes', 'Response body bytes by view.', '{}'),
+    ):
+        family(name, 'counter', help_text)
+        for view, stats in sorted(views.items()):
+            lines.append(f'{name}{{view="{label(view)}"}} ' + fmt.format(stats[key]))
+
+    family('shop_cache_events_total', 'counter', 'Two-tier shop cache events (see shop.caching).')
+    for event, count in sorted(cache.items()):
+        if event != 'l1_entries':
+            lines.append(f'shop_cache_events_total{{event="{event}"}} {count}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE shop_product ADD COLUMN search_vector tsvector")
+        schema_editor.execute(
+            "UPDATE shop_product SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        )
+        schema_editor.execute(
+            "CREATE INDEX shop_product_search_vector_gin ON shop_product USING GIN (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # Falls back to the in-process index at runtime
+                return
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE shop_product_fts USING fts5("
+            "name, description, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO shop_product_fts (rowid, name, description) "
+            "SELECT id, name, description FROM shop_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS shop_product_search_vector_gin")
+        schema_editor.execute("ALTER TABLE shop_product DROP COLUMN IF EXISTS search_vector")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS shop_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_alter_cart_session_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+import shop.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=shop.storage.ContentHashStorage(), upload_to='categories/'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=shop.storage.ContentHashStorage(), upload_to='products/'),
+        ),
+    ]
@@ -1,14 +1,80 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Q, Sum, ExpressionWrapper, DecimalField, Prefetch, prefetch_related_objects
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .storage import image_storage
+
+
+# 18% GST in India
+TAX_RATE = Decimal('0.18')
+
+
+def line_total(quantity, price):
+    """SQL expression for quantity * price on a cart or order line"""
+    return ExpressionWrapper(F(quantity) * F(price), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+class Totals:
+    """Quantity and money totals for a cart or an order"""
+
+    def __init__(self, quantity=None, subtotal=None):
+        self.quantity = quantity or 0
+        self.subtotal = subtotal if subtotal is not None else Decimal('0.00')
+        self.tax = self.subtotal * TAX_RATE
+        self.grand_total = self.subtotal + self.tax
+
+
+class TotalsMixin:
+    """
+    Shared totals lookup for Cart and Order.
+
+    Totals come from, in order: annotations added by `with_totals()`, items
+    already prefetched on the instance, or one aggregate query. The result is
+    memoised on the instance so repeated calls in a request are free.
+    """
+
+    def _line_values(self, item):
+        raise NotImplementedError
+
+    def _aggregate_totals(self):
+        raise NotImplementedError
+
+    def get_totals(self):
+        totals = getattr(self, '_totals', None)
+        if totals is not None:
+            return totals
+
+        if hasattr(self, 'items_subtotal'):
+            totals = Totals(self.items_quantity, self.items_subtotal)
+        elif 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            lines = [self._line_values(item) for item in self.items.all()]
+            totals = Totals(
+                sum(quantity for quantity, _ in lines),
+                sum((quantity * price for quantity, price in lines), Decimal('0.00')),
+            )
+        else:
+            row = self._aggregate_totals()
+            totals = Totals(row['lines_quantity'], row['lines_subtotal'])
+
+        self._totals = totals
+        return totals
+
+    def refresh_totals(self):
+        """Forget memoised totals and prefetched items after the lines change"""
+        self._totals = None
+        for attr in ('items_quantity', 'items_subtotal'):
+            self.__dict__.pop(attr, None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('items', None)
+
 class Category(models.Model):
     """Product category model"""
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True, default='')
-    image = models.ImageField(upload_to='categories/', null=True, blank=True)
+    image = models.ImageField(upload_to='categories/', storage=image_storage, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -25,13 +91,20 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
-    image = models.ImageField(upload_to='products/', null=True, blank=True)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', null=True, blank=True)
+    image = models.ImageField(upload_to='products/', storage=image_storage, null=True, blank=True)
+    # Indexed by shop_product_cat_created_idx below
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', null=True, blank=True, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        # Both match the keyset order used by shop.pagination, so a page is
+        # one index range scan with no sort (`manage.py bench_indexes` checks)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='shop_product_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='shop_product_cat_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -39,26 +112,59 @@ class Product(models.Model):
     def is_in_stock(self):
         return self.stock > 0
 
-class Cart(models.Model):
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item quantity and subtotal for every cart in one query"""
+        return self.annotate(
+            items_quantity=Sum('items__quantity'),
+            items_subtotal=Sum(line_total('items__quantity', 'items__product__price')),
+        )
+
+
+class Cart(TotalsMixin, models.Model):
     """Shopping cart model to track cart items"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    session_key = models.CharField(max_length=40, db_index=True)
+    session_key = models.CharField(max_length=40)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Only guest carts are looked up by session; user carts go through the user FK
+            models.Index(fields=['session_key'], condition=Q(user__isnull=True), name='shop_cart_guest_session_idx'),
+        ]
     
     def __str__(self):
         if self.user:
             return f"Cart {self.id} - {self.user.username}"
         return f"Cart {self.id} - Guest"
 
+    def _line_values(self, item):
+        return item.quantity, item.product.price
+
+    def _aggregate_totals(self):
+        return self.items.aggregate(
+            lines_quantity=Sum('quantity'),
+            lines_subtotal=Sum(line_total('quantity', 'product__price')),
+        )
+
+    def prefetch_items(self):
+        """Load the cart lines with their products in one query and return them"""
+        prefetch_related_objects(
+            [self], Prefetch('items', queryset=CartItem.objects.select_related('product__category'))
+        )
+        return self.items.all()
+
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals().quantity
 
     def get_total(self):
-        return sum(item.get_subtotal() for item in self.items.all())
+        return self.get_totals().subtotal
 
     def get_item_count(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals().quantity
 
 
 class CartItem(models.Model):
@@ -79,7 +185,16 @@ class CartItem(models.Model):
         return self.product.price * self.quantity
 
 
-class Order(models.Model):
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item quantity and subtotal for every order in one query"""
+        return self.annotate(
+            items_quantity=Sum('items__quantity'),
+            items_subtotal=Sum(line_total('items__quantity', 'items__price')),
+        )
+
+
+class Order(TotalsMixin, models.Model):
     """Order model to store completed orders"""
     ORDER_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -93,7 +208,8 @@ class Order(models.Model):
         ('cod', 'Cash on Delivery'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
+    # Indexed by shop_order_user_created_idx below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders', db_index=False)
 
 
     # Customer info
@@ -116,9 +232,22 @@ class Order(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Stored invoice PDF (see shop.invoices)
+    invoice_version = models.CharField(max_length=64, blank=True, default='')
+    invoice_sha256 = models.CharField(max_length=64, blank=True, default='')
+    invoice_rendered_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # my_orders / user_profile, admin_orders by status, admin_orders by date
+            models.Index(fields=['user', '-created_at', '-id'], name='shop_order_user_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='shop_order_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='shop_order_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.first_name} {self.last_name}"
@@ -126,9 +255,18 @@ class Order(models.Model):
     def get_full_address(self):
         return f"{self.address}, {self.city}, {self.state} {self.postal_code}"
     
+    def _line_values(self, item):
+        return item.quantity, item.price
+
+    def _aggregate_totals(self):
+        return self.items.aggregate(
+            lines_quantity=Sum('quantity'),
+            lines_subtotal=Sum(line_total('quantity', 'price')),
+        )
+
     def get_subtotal(self):
-        """Calculate subtotal from all order items"""
-        return sum(item.price * item.quantity for item in self.items.all())
+        """Subtotal of all order items (see get_totals)"""
+        return self.get_totals().subtotal
     
     def get_shipping_cost(self):
         """Calculate shipping cost (FREE shipping for all orders)"""
@@ -136,9 +274,7 @@ class Order(models.Model):
     
     def get_tax(self):
         """Calculate tax (18% GST in India)"""
-        from decimal import Decimal
-        subtotal = self.get_subtotal()
-        return subtotal * Decimal('0.18')
+        return self.get_totals().tax
 
 class OrderItem(models.Model):
     """Items in an order"""
@@ -152,3 +288,78 @@ class OrderItem(models.Model):
     
     def get_subtotal(self):
         return self.price * self.quantity
+
+
+class Job(models.Model):
+    """Background job run by the `run_jobs` worker (see shop.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='shop_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} {self.name} ({self.status})"
+
+
+class EmailOutbox(models.Model):
+    """One customer email per (order, template), delivered by a background job"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='emails')
+    template = models.CharField(max_length=50)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('order', 'template')
+        verbose_name_plural = 'Email outbox'
+
+    def __str__(self):
+        return f"{self.template} email for Order #{self.order_id} ({self.status})"
+
+
+class StockReservation(models.Model):
+    """Units of a product held for a cart until expires_at (see shop.reservations)"""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations', db_index=False)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Live holds on a product, and the sweeper's expiry scan
+            models.Index(fields=['product', 'expires_at'], name='shop_reservation_live_idx'),
+            models.Index(fields=['expires_at'], name='shop_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for cart {self.cart_id} until {self.expires_at:%H:%M}"
@@ -0,0 +1,125 @@
+"""
+Order placement core used by checkout.
+
+The cart's products are locked in id order and checked against other carts'
+stock reservations (shop.reservations), then stock is taken with conditional
+UPDATEs (stock = stock - qty WHERE stock >= qty). Concurrent buyers never lose
+updates, stock never goes negative, and transactions touching the same
+products always lock them in the same order, so they cannot deadlock. Order
+lines are written with a single bulk_create.
+"""
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from . import fragments, jobs, outbox, reservations
+from .models import Product, CartItem, Order, OrderItem
+
+
+ORDER_FIELDS = [
+    'first_name', 'last_name', 'email', 'phone',
+    'address', 'city', 'state', 'postal_code', 'payment_method',
+]
+
+
+class OutOfStockLine:
+    def __init__(self, product, requested, available):
+        self.product = product
+        self.requested = requested
+        self.available = available
+
+    def __str__(self):
+        if self.available:
+            return f'Only {self.available} of {self.product.name} left in stock.'
+        return f'{self.product.name} is out of stock.'
+
+
+class OrderResult:
+    """Outcome of place_order: either an order or the lines that could not be filled"""
+
+    def __init__(self, order=None, out_of_stock=None):
+        self.order = order
+        self.out_of_stock = out_of_stock or []
+
+    @property
+    def ok(self):
+        return self.order is not None
+
+
+def place_order(user, cart, details):
+    """
+    Turn the cart into an order.
+
+    `details` holds the checkout form's cleaned data. Returns an OrderResult;
+    when any line is short of stock nothing is written and every short line
+    is reported.
+    """
+    lines = sorted(cart.prefetch_items(), key=lambda item: item.product_id)
+    if not lines:
+        return OrderResult()
+
+    order = None
+    with transaction.atomic():
+        now = timezone.now()
+        # Locks the products; lines the cart still holds skip the availability check
+        short = reservations.unfillable(cart, lines, now)
+        if not short:
+            for item in lines:
+                taken = Product.objects.filter(pk=item.product_id, stock__gte=item.quantity).update(
+                    stock=F('stock') - item.quantity, updated_at=now,
+                )
+                if not taken:
+                    short.append(item)
+
+        if short:
+            # Undo the decrements that did succeed
+            transaction.set_rollback(True)
+        else:
+            # The held units are now the order's
+            reservations.release(cart)
+            order = create_order(user, cart, lines, details)
+            # Cached grids show stock levels
+            transaction.on_commit(lambda: fragments.bump_generation('products'))
+
+    if order is None:
+        available = reservations.available_to_sell([item.product_id for item in short], cart)
+        return OrderResult(out_of_stock=[
+            OutOfStockLine(item.product, item.quantity, available.get(item.product_id, 0))
+            for item in short
+        ])
+
+    return OrderResult(order=order)
+
+
+def create_order(user, cart, lines, details):
+    """Write the order and its lines and empty the cart (stock already taken)"""
+    totals = cart.get_totals()
+    order = Order.objects.create(
+        user=user,
+        total_amount=totals.grand_total,
+        status='pending',
+        **{field: details[field] for field in ORDER_FIELDS},
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product_id=item.product_id,
+            quantity=item.quantity,
+            price=item.product.price,
+        )
+        for item in lines
+    ])
+
+    # Delete the loaded lines so delete signals see their cached cart
+    collector = Collector(using=router.db_for_write(CartItem), origin=cart)
+    collector.collect(lines)
+    collector.delete()
+    cart.refresh_totals()
+
+    # Committed with the order; the run_jobs worker does the PDF and SMTP
+    # work outside this transaction.
+    jobs.enqueue('render_invoice', {'order_id': order.id})
+    outbox.queue_order_email(order, 'invoice')
+    outbox.queue_order_email(order, 'order_confirmation')
+    return order
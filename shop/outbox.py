@@ -0,0 +1,135 @@
+"""
+Email outbox for order emails.
+
+Each (order, template) pair gets exactly one EmailOutbox row, written when the
+order is placed and delivered by a `deliver_email` background job. Retried
+jobs, page refreshes and crawler hits can never send a duplicate.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import invoices, jobs
+from .models import EmailOutbox, Order
+
+
+def build_invoice_email(order):
+    subject = f"ShopHub Invoice - Order #{order.id}"
+    body = f"""
+Hello {order.first_name},
+
+Thank you for shopping with ShopHub ❤️
+
+Your order has been placed successfully.
+
+Order ID: {order.id}
+Total Amount: ₹{order.get_totals().grand_total}
+
+Your invoice PDF is attached with this email.
+
+We will ship your order soon.
+
+Thanks & Regards,
+ShopHub Team
+"""
+    return subject, body
+
+
+def build_confirmation_email(order):
+    subject = f'Order Confirmation #{order.id} - ShopHub'
+    body = f"""
+Hello {order.first_name},
+
+Thank you for your order!
+
+Order Number: #{order.id}
+Order Date: {order.created_at.strftime('%d-%m-%Y %H:%M:%S')}
+Status: {order.get_status_display()}
+
+Delivery Address:
+{order.address}
+{order.city}, {order.state} {order.postal_code}
+
+Order Summary:
+Subtotal: Rs{order.get_subtotal():.2f}
+Shipping: FREE
+Tax (18% GST): Rs{order.get_tax():.2f}
+Total Amount: Rs{order.total_amount:.2f}
+
+Payment Method: Cash on Delivery (COD)
+You'll pay when your order arrives at your doorstep.
+
+We'll process your order shortly and send you tracking details.
+
+Thank you for shopping with us!
+
+Best regards,
+ShopHub Team
+support@shophub.com
+        """
+    return subject, body
+
+
+EMAIL_TEMPLATES = {
+    'invoice': build_invoice_email,
+    'order_confirmation': build_confirmation_email,
+}
+
+# Templates that carry the invoice PDF as an attachment
+ATTACH_INVOICE = {'invoice'}
+
+
+def queue_order_email(order, template):
+    """
+    Record the email for (order, template) and queue its delivery. Does
+    nothing if it was already recorded. Returns the outbox row.
+    """
+    existing = EmailOutbox.objects.filter(order=order, template=template).first()
+    if existing:
+        return existing
+
+    subject, body = EMAIL_TEMPLATES[template](order)
+    try:
+        with transaction.atomic():
+            email = EmailOutbox.objects.create(
+                order=order,
+                template=template,
+                to_email=order.email,
+                subject=subject,
+                body=body,
+            )
+            jobs.enqueue('deliver_email', {'outbox_id': email.id})
+    except IntegrityError:
+        # Someone else recorded it first
+        return EmailOutbox.objects.get(order=order, template=template)
+    return email
+
+
+def deliver(outbox_id):
+    """Send one outbox email unless it has already gone out"""
+    email = EmailOutbox.objects.select_related('order').get(id=outbox_id)
+    if email.status == 'sent':
+        return email
+
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[email.to_email],
+    )
+    if email.template in ATTACH_INVOICE:
+        order = Order.objects.get(id=email.order_id)
+        message.attach(f"invoice_{order.id}.pdf", invoices.get_invoice_pdf(order), "application/pdf")
+
+    try:
+        message.send(fail_silently=False)
+    except Exception as e:
+        EmailOutbox.objects.filter(id=email.id).update(last_error=str(e))
+        raise
+
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    email.save(update_fields=['status', 'sent_at', 'last_error'])
+    return email
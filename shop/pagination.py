@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination for product listings.
+
+Pages are keyed on (created_at, id) to match Product.Meta.ordering, so every
+page is a single range scan on the ordering columns - no OFFSET and no COUNT(*).
+Deep pages cost the same as page 1.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+PAGE_SIZE = 24
+
+
+def encode_token(*parts):
+    """Pack key values into an opaque, URL-safe cursor token"""
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token, count):
+    """Unpack a cursor token into `count` strings, or None if it is invalid"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded).decode().split('|')
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+    return parts if len(parts) == count else None
+
+
+def encode_cursor(product):
+    """Build a cursor token for a product row"""
+    return encode_token(product.created_at.isoformat(), product.pk)
+
+
+def decode_cursor(token):
+    """Return (created_at, id) for a cursor token, or None if it is invalid"""
+    parts = decode_token(token, 2)
+    if not parts:
+        return None
+    try:
+        return datetime.fromisoformat(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+
+class KeysetPage:
+    """One page of products plus the cursors needed to move around it"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Other query params (search terms, filters) to keep in page links
+        self.base_query = ''
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def paginate(queryset, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Slice a product queryset into one keyset page.
+
+    `after` walks forward (older products), `before` walks back (newer products).
+    Invalid cursors fall back to the first page.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key:
+        created_at, pk = before_key
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            .order_by('created_at', 'id')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        has_next = True
+    else:
+        queryset = queryset.order_by('-created_at', '-id')
+        if after_key:
+            created_at, pk = after_key
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(queryset[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_key is not None
+
+    if not rows:
+        return KeysetPage([])
+
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        previous_cursor=encode_cursor(rows[0]) if has_previous else None,
+    )
+
+
+def base_query(request):
+    """The request's query string without cursor params, for building page links"""
+    params = request.GET.copy()
+    for key in ('after', 'before', 'format'):
+        params.pop(key, None)
+    return params.urlencode()
+
+
+def paginate_request(request, queryset, page_size=PAGE_SIZE):
+    """Paginate using the ?after= / ?before= cursors on the request"""
+    page = paginate(
+        queryset,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=page_size,
+    )
+    page.base_query = base_query(request)
+    return page
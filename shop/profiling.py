@@ -0,0 +1,201 @@
+"""
+Sampling profiler for slow requests.
+
+ProfilingMiddleware runs in the normal middleware chain, so it covers both
+shopconfig.wsgi and shopconfig.asgi. It profiles a request when
+
+  * a staff user asks for it with an "X-Profile: 1" header or ?_profile=1
+    (always saved, and the response gets an X-Profile-Id header), or
+  * the request falls in the SHOP_PROFILING['SAMPLE_RATE'] fraction of all
+    traffic (saved only if it took longer than SLOW_THRESHOLD seconds).
+
+While a request is profiled, a background thread samples the stack of the
+thread serving it every INTERVAL seconds, so time spent waiting on the
+database shows up under the code that issued the query. Every SQL statement
+is recorded with its duration.
+
+A saved profile is two files in SHOP_PROFILING['DIR']:
+
+    <id>.folded  collapsed stacks ("a;b;c <samples>"), ready for flamegraph.pl,
+                 speedscope or inferno
+    <id>.json    request metadata and the SQL log
+
+Only the newest MAX_PROFILES profiles are kept. `manage.py profiles` lists
+and summarizes them.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'shophub-profiles'),
+    'SAMPLE_RATE': 0.0,     # fraction of requests profiled automatically
+    'SLOW_THRESHOLD': 1.0,  # seconds; sampled requests faster than this are dropped
+    'INTERVAL': 0.005,      # seconds between stack samples
+    'MAX_PROFILES': 200,
+}
+
+TRIGGER_HEADER = 'X-Profile'
+TRIGGER_PARAM = '_profile'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SHOP_PROFILING', {})}
+
+
+class StackSampler(threading.Thread):
+    """Collects collapsed stacks of one thread until stop() is called"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='shop-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class SQLRecorder:
+    """execute_wrapper that logs each statement and how long it took"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({'sql': sql, 'ms': round((time.perf_counter() - started) * 1000, 3), 'many': many})
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        # Only look at the user when asked: loading the session adds
+        # Vary: Cookie, which would make public responses uncacheable
+        requested = request.headers.get(TRIGGER_HEADER) == '1' or request.GET.get(TRIGGER_PARAM) == '1'
+        forced = requested and request.user.is_staff
+        if not forced and random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), config['INTERVAL'])
+        recorder = SQLRecorder()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            sampler.stop()
+        seconds = time.perf_counter() - started
+
+        if forced or seconds >= config['SLOW_THRESHOLD']:
+            profile_id = save_profile(config, request, response, seconds, sampler, recorder, forced)
+            if forced:
+                response['X-Profile-Id'] = profile_id
+        return response
+
+
+def save_profile(config, request, response, seconds, sampler, recorder, forced):
+    directory = config['DIR']
+    os.makedirs(directory, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    with open(os.path.join(directory, f'{profile_id}.folded'), 'w') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+    meta = {
+        'id': profile_id,
+        'time': time.time(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': (match.view_name if match else None) or 'unresolved',
+        'status': response.status_code,
+        # Sampled requests only name the user if the view already loaded them
+        'user': request.user.pk if forced or request.session.accessed else None,
+        'trigger': 'staff' if forced else 'sample',
+        'duration_ms': round(seconds * 1000, 1),
+        'interval_ms': config['INTERVAL'] * 1000,
+        'samples': sampler.samples,
+        'sql_count': len(recorder.queries),
+        'sql_ms': round(sum(q['ms'] for q in recorder.queries), 3),
+        'sql': recorder.queries,
+    }
+    with open(os.path.join(directory, f'{profile_id}.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+    prune(directory, config['MAX_PROFILES'])
+    return profile_id
+
+
+def list_profiles(directory=None):
+    """Metadata of saved profiles, newest first"""
+    directory = directory or get_config()['DIR']
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda meta: meta['time'], reverse=True)
+
+
+def load_stacks(profile_id, directory=None):
+    directory = directory or get_config()['DIR']
+    stacks = Counter()
+    with open(os.path.join(directory, f'{profile_id}.folded')) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            stacks[stack] += int(count)
+    return stacks
+
+
+def delete_profile(profile_id, directory=None):
+    directory = directory or get_config()['DIR']
+    for ext in ('.json', '.folded'):
+        try:
+            os.remove(os.path.join(directory, profile_id + ext))
+        except FileNotFoundError:
+            pass
+
+
+def prune(directory, keep):
+    for meta in list_profiles(directory)[keep:]:
+        delete_profile(meta['id'], directory)
@@ -0,0 +1,93 @@
+"""
+Resized WebP/JPEG renditions of product and category images.
+
+Originals are full-size photos several megabytes each. For every uploaded
+image we store fixed-width copies next to it under renditions/ and the
+`responsive_image` template tag points the browser at them with srcset, so a
+card a few hundred pixels wide downloads a few dozen kilobytes.
+
+Renditions are generated by the `generate_renditions` background job when an
+image is saved, and for existing media by the `build_renditions` command.
+Which widths exist for an image is cached so rendering a page never touches
+storage.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .caching import shop_cache
+
+
+RENDITION_WIDTHS = (160, 320, 640, 960)
+FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+QUALITY = 80
+
+MANIFEST_TIMEOUT = 60 * 60 * 24
+MISSING_TIMEOUT = 60
+
+
+def rendition_name(name, width, ext):
+    """renditions/products/shoe.jpg -> renditions/products/shoe-320w.webp"""
+    root, _ = os.path.splitext(name)
+    return f"renditions/{root}-{width}w.{ext}"
+
+
+def manifest_key(name):
+    return f"shop:renditions:{name}"
+
+
+def available_widths(name, storage=default_storage):
+    """Widths that have been rendered for the image `name` (cached)"""
+    widths = shop_cache.get(manifest_key(name))
+    if widths is None:
+        widths = [
+            width for width in RENDITION_WIDTHS
+            if storage.exists(rendition_name(name, width, 'webp'))
+        ]
+        shop_cache.set(manifest_key(name), widths, MANIFEST_TIMEOUT if widths else MISSING_TIMEOUT)
+    return widths
+
+
+def generate_renditions(name, storage=default_storage, force=False):
+    """
+    Render every width up to the original's size in each format. Existing
+    files are kept unless `force`. Returns the list of widths available.
+    """
+    with storage.open(name, 'rb') as f:
+        source = Image.open(f)
+        source.load()
+    source = ImageOps.exif_transpose(source)
+    if source.mode != 'RGB':
+        source = source.convert('RGB')
+
+    widths = []
+    for width in RENDITION_WIDTHS:
+        if width > source.width:
+            # Never upscale
+            break
+        resized = None
+        for fmt, ext in FORMATS:
+            path = rendition_name(name, width, ext)
+            if storage.exists(path):
+                if not force:
+                    continue
+                storage.delete(path)
+            if resized is None:
+                height = round(source.height * width / source.width)
+                resized = source.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, fmt, quality=QUALITY, optimize=True)
+            storage.save(path, ContentFile(buffer.getvalue()))
+        widths.append(width)
+
+    shop_cache.set(manifest_key(name), widths, MANIFEST_TIMEOUT if widths else MISSING_TIMEOUT)
+    return widths
+
+
+def srcset(name, widths, ext, storage=default_storage):
+    return ', '.join(
+        f"{storage.url(rendition_name(name, width, ext))} {width}w" for width in widths
+    )
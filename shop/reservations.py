@@ -0,0 +1,152 @@
+"""
+Time-limited stock reservations for signed-in carts.
+
+Adding to a cart places a hold (StockReservation) on those units for
+SHOP_RESERVATION_TTL seconds; changing the quantity or opening checkout
+renews it. Available-to-sell is
+
+    stock - sum(quantity of other carts' holds that have not expired)
+
+so a hold stops counting the moment it expires. The sweep_reservations
+command only deletes dead rows; correctness never waits for it.
+
+Writes lock the product rows (SELECT ... FOR UPDATE, in id order like
+checkout) before reading the live holds, so two carts cannot both claim the
+last unit. Guest carts live in a cookie and hold nothing; their lines are
+reserved when they are merged into the user's cart at login.
+
+At checkout, lines fully covered by the cart's own live holds are taken
+without re-checking anyone else's holds. Only lines whose hold lapsed are
+checked against availability, in one query, and the holds are released in
+the same transaction that decrements stock.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Product, StockReservation
+
+
+DEFAULT_TTL = 15 * 60
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'SHOP_RESERVATION_TTL', DEFAULT_TTL))
+
+
+def live(now=None):
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def reserved_by_others(product_ids, cart=None, now=None):
+    """{product_id: units held by live reservations of carts other than `cart`}"""
+    holds = live(now).filter(product_id__in=product_ids)
+    if cart is not None:
+        holds = holds.exclude(cart=cart)
+    return dict(holds.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+
+
+def available_to_sell(product_ids, cart=None, now=None):
+    """{product_id: stock minus other carts' live holds}, never below zero"""
+    product_ids = list(product_ids)
+    stock = dict(Product.objects.filter(pk__in=product_ids).values_list('id', 'stock'))
+    reserved = reserved_by_others(product_ids, cart, now)
+    return {pk: max(units - reserved.get(pk, 0), 0) for pk, units in stock.items()}
+
+
+def lock_stock(product_ids):
+    """Lock the product rows in id order and return {product_id: stock}"""
+    products = Product.objects.filter(pk__in=product_ids).order_by('id')
+    if not connection.features.has_select_for_update:
+        # SQLite: take the write lock up front with a no-op UPDATE. A
+        # transaction that reads first fails at once with "database is
+        # locked" when it later tries to write under contention.
+        products.update(stock=F('stock'))
+    else:
+        products = products.select_for_update()
+    return dict(products.values_list('id', 'stock'))
+
+
+def _hold(cart, quantities, now):
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=now + ttl())
+            for product_id, quantity in quantities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['cart', 'product'],
+        update_fields=['quantity', 'expires_at'],
+    )
+
+
+def reserve(cart, product_id, quantity):
+    """
+    Hold `quantity` units (the cart line's new total) for the cart.
+    Returns (ok, available); nothing changes when ok is False.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        stock = lock_stock([product_id]).get(product_id, 0)
+        available = max(stock - reserved_by_others([product_id], cart, now).get(product_id, 0), 0)
+        if quantity > available:
+            return False, available
+        _hold(cart, {product_id: quantity}, now)
+    return True, available
+
+
+def reserve_many(cart, quantities):
+    """Hold up to the requested units per product; returns {product_id: units granted}"""
+    with transaction.atomic():
+        now = timezone.now()
+        stock = lock_stock(quantities)
+        reserved = reserved_by_others(stock, cart, now)
+        granted = {
+            product_id: min(quantity, max(stock[product_id] - reserved.get(product_id, 0), 0))
+            for product_id, quantity in quantities.items()
+            if product_id in stock
+        }
+        _hold(cart, {pk: units for pk, units in granted.items() if units > 0}, now)
+    return granted
+
+
+def release(cart, product_ids=None):
+    holds = StockReservation.objects.filter(cart=cart)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    holds.delete()
+
+
+def extend(cart):
+    """Renew the cart's live holds; lapsed ones are not revived"""
+    now = timezone.now()
+    return live(now).filter(cart=cart).update(expires_at=now + ttl())
+
+
+def unfillable(cart, lines, now):
+    """
+    Lock the lines' products and return the lines that cannot be filled.
+    Must run inside the checkout transaction.
+    """
+    stock = lock_stock([item.product_id for item in lines])
+    held = dict(live(now).filter(cart=cart).values_list('product_id', 'quantity'))
+    # Only lines the cart no longer fully holds need other carts' holds
+    unheld = [item.product_id for item in lines if held.get(item.product_id, 0) < item.quantity]
+    reserved = reserved_by_others(unheld, cart, now) if unheld else {}
+    return [
+        item for item in lines
+        if stock.get(item.product_id, 0) - reserved.get(item.product_id, 0) < item.quantity
+    ]
+
+
+def sweep(batch_size=1000):
+    """Delete one batch of expired holds; returns how many went"""
+    ids = list(
+        StockReservation.objects.filter(expires_at__lte=timezone.now())
+        .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    return StockReservation.objects.filter(id__in=ids).delete()[0]
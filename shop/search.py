@@ -0,0 +1,325 @@
+"""
+Ranked full-text product search.
+
+Each backend keeps a search vector per Product and ranks matches with name
+hits weighted above description hits:
+
+- PostgresSearchBackend: weighted tsvector column + GIN index (production)
+- SQLiteFTSBackend: FTS5 virtual table ranked with bm25 (local runs)
+- InMemorySearchBackend: in-process inverted index, used when neither of the
+  above is available. It is per worker and only sees saves made in-process.
+
+Results are paged with keyset cursors on (score, id), where score is the rank
+scaled to an integer so the cursor comparison is exact.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+
+from .models import Product
+from .pagination import KeysetPage, PAGE_SIZE, encode_token, decode_token
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Rank multiplier used to turn float relevance into integer keyset scores
+SCORE_SCALE = 1000000
+
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def decode_search_cursor(token):
+    """Return (score, id) for a search cursor token, or None if it is invalid"""
+    parts = decode_token(token, 2)
+    if not parts:
+        return None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+
+class SQLSearchBackend:
+    """Shared keyset paging for backends that rank inside the database"""
+
+    # Subclasses provide SQL selecting (id, score) for every match of %s
+    ranked_sql = None
+
+    def match_param(self, query):
+        return query
+
+    def ranked_ids(self, query, after=None, before=None, limit=PAGE_SIZE):
+        sql = f"SELECT id, score FROM ({self.ranked_sql}) ranked"
+        params = [self.match_param(query)]
+        if before:
+            sql += " WHERE score > %s OR (score = %s AND id > %s) ORDER BY score ASC, id ASC"
+            params += [before[0], before[0], before[1]]
+        else:
+            if after:
+                sql += " WHERE score < %s OR (score = %s AND id < %s)"
+                params += [after[0], after[0], after[1]]
+            sql += " ORDER BY score DESC, id DESC"
+        sql += " LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class PostgresSearchBackend(SQLSearchBackend):
+    """tsvector column on shop_product, maintained by index() on save"""
+
+    vector_sql = (
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    )
+    ranked_sql = (
+        f"SELECT id, (ts_rank(search_vector, q) * {SCORE_SCALE})::bigint AS score "
+        "FROM shop_product, websearch_to_tsquery('english', %s) q "
+        "WHERE search_vector @@ q"
+    )
+
+    def index(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE shop_product SET search_vector = {self.vector_sql} WHERE id = ANY(%s)",
+                [list(product_ids)],
+            )
+
+    def remove(self, product_ids):
+        # The vector lives on the product row, so it goes away with it
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE shop_product SET search_vector = {self.vector_sql}")
+            return cursor.rowcount
+
+
+class SQLiteFTSBackend(SQLSearchBackend):
+    """FTS5 table shop_product_fts whose rowid is the product id"""
+
+    ranked_sql = (
+        f"SELECT rowid AS id, "
+        f"CAST(-bm25(shop_product_fts, {NAME_WEIGHT}.0, {DESCRIPTION_WEIGHT}.0) * {SCORE_SCALE} AS INTEGER) AS score "
+        "FROM shop_product_fts WHERE shop_product_fts MATCH %s"
+    )
+
+    def match_param(self, query):
+        # Quote every token so user input is never parsed as FTS syntax
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        self.remove(product_ids)
+        rows = Product.objects.filter(id__in=product_ids).values_list('id', 'name', 'description')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO shop_product_fts (rowid, name, description) VALUES (%s, %s, %s)",
+                list(rows),
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "DELETE FROM shop_product_fts WHERE rowid = %s",
+                [(pk,) for pk in product_ids],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM shop_product_fts")
+            cursor.execute(
+                "INSERT INTO shop_product_fts (rowid, name, description) "
+                "SELECT id, name, description FROM shop_product"
+            )
+            return cursor.rowcount
+
+
+class InMemorySearchBackend:
+    """Inverted index of token -> {product_id: weight}, built lazily per worker"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = None
+        self.documents = {}
+        self.vocabulary = []
+
+    def _add(self, pk, name, description):
+        weights = defaultdict(int)
+        for token in tokenize(name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        self.documents[pk] = list(weights)
+        for token, weight in weights.items():
+            if token not in self.postings and self.vocabulary is not None:
+                bisect.insort(self.vocabulary, token)
+            self.postings.setdefault(token, {})[pk] = weight
+
+    def _discard(self, pk):
+        for token in self.documents.pop(pk, ()):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(pk, None)
+            if not posting:
+                del self.postings[token]
+                index = bisect.bisect_left(self.vocabulary, token)
+                del self.vocabulary[index]
+
+    def _ensure_loaded(self):
+        if self.postings is None:
+            self._load()
+
+    def _load(self):
+        self.postings = {}
+        self.documents = {}
+        self.vocabulary = None
+        rows = Product.objects.values_list('id', 'name', 'description').iterator(chunk_size=2000)
+        for pk, name, description in rows:
+            self._add(pk, name, description)
+        self.vocabulary = sorted(self.postings)
+
+    def index(self, product_ids):
+        with self.lock:
+            if self.postings is None:
+                return
+            rows = Product.objects.filter(id__in=list(product_ids)).values_list('id', 'name', 'description')
+            for pk, name, description in rows:
+                self._discard(pk)
+                self._add(pk, name, description)
+
+    def remove(self, product_ids):
+        with self.lock:
+            if self.postings is None:
+                return
+            for pk in product_ids:
+                self._discard(pk)
+
+    def rebuild(self):
+        with self.lock:
+            self._load()
+            return len(self.documents)
+
+    def _prefix_scores(self, token):
+        """Summed weights for every indexed token starting with `token`"""
+        scores = defaultdict(int)
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            for pk, weight in self.postings[word].items():
+                scores[pk] += weight
+        return scores
+
+    def ranked_ids(self, query, after=None, before=None, limit=PAGE_SIZE):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self.lock:
+            self._ensure_loaded()
+            totals = None
+            for token in tokens:
+                scores = self._prefix_scores(token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {pk: totals[pk] + scores[pk] for pk in totals if pk in scores}
+                if not totals:
+                    return []
+
+        ranked = sorted(((pk, score * SCORE_SCALE) for pk, score in totals.items()),
+                        key=lambda row: (row[1], row[0]), reverse=True)
+        if before:
+            ranked = [row for row in ranked if (row[1], row[0]) > before]
+            # Same contract as the SQL backends: ascending, nearest the cursor first
+            return list(reversed(ranked))[:limit]
+        if after:
+            ranked = [row for row in ranked if (row[1], row[0]) < after]
+        return ranked[:limit]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Pick the best backend available on the default database"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if connection.vendor == 'postgresql':
+                    _backend = PostgresSearchBackend()
+                elif (connection.vendor == 'sqlite'
+                        and 'shop_product_fts' in connection.introspection.table_names()):
+                    _backend = SQLiteFTSBackend()
+                else:
+                    _backend = InMemorySearchBackend()
+    return _backend
+
+
+def index_products(product_ids):
+    """Refresh the search vectors of the given products"""
+    product_ids = list(product_ids)
+    if product_ids:
+        get_backend().index(product_ids)
+
+
+def remove_products(product_ids):
+    product_ids = list(product_ids)
+    if product_ids:
+        get_backend().remove(product_ids)
+
+
+def rebuild_index():
+    """Re-index the whole catalog and return the number of indexed products"""
+    return get_backend().rebuild()
+
+
+def search_products(query, after=None, before=None, page_size=PAGE_SIZE):
+    """Return one KeysetPage of products ranked by relevance to `query`"""
+    if not tokenize(query):
+        return KeysetPage([])
+
+    after_key = decode_search_cursor(after)
+    before_key = decode_search_cursor(before)
+
+    rows = list(get_backend().ranked_ids(
+        query, after=after_key, before=None if after_key else before_key, limit=page_size + 1,
+    ))
+
+    if before_key and not after_key:
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        has_next = True
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_key is not None
+
+    if not rows:
+        return KeysetPage([])
+
+    products = Product.objects.select_related('category').in_bulk([pk for pk, _ in rows])
+    items = [products[pk] for pk, _ in rows if pk in products]
+
+    first_pk, first_score = rows[0]
+    last_pk, last_score = rows[-1]
+    return KeysetPage(
+        items,
+        next_cursor=encode_token(last_score, last_pk) if has_next else None,
+        previous_cursor=encode_token(first_score, first_pk) if has_previous else None,
+    )
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import covers, fragments, jobs, renditions, search
+from .cart_badge import invalidate_cart_count
+from .models import Category, Product, Cart, CartItem
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    """Keep the product's search vector in step with its name/description"""
+    if raw:
+        return
+    search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def queue_image_renditions(sender, instance, raw=False, **kwargs):
+    """Resize a newly uploaded image in the background"""
+    if raw or not instance.image:
+        return
+    if not renditions.available_widths(instance.image.name):
+        # Every save of the product lands here until the job has run
+        jobs.enqueue_once('generate_renditions', {'name': instance.image.name})
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_covers(sender, instance, **kwargs):
+    """A new, removed or re-categorised product can change a home page cover"""
+    covers.invalidate_category_covers()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_fragments(sender, instance, **kwargs):
+    fragments.bump_generation('products')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_fragments(sender, instance, **kwargs):
+    """Category names appear in the sidebar and in every grid's badges"""
+    fragments.bump_generation('categories')
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def refresh_cart_badge_for_cart(sender, instance, **kwargs):
+    invalidate_cart_count(instance)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def refresh_cart_badge(sender, instance, **kwargs):
+    """Drop the cached navbar count whenever a cart line changes"""
+    try:
+        cart = instance.cart
+    except Cart.DoesNotExist:
+        return
+    invalidate_cart_count(cart)
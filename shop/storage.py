@@ -0,0 +1,44 @@
+"""
+Content-addressed media storage for catalog images.
+
+Files are named by the SHA-256 of their bytes (products/ab/ab12...ef.jpg), so
+saving the same picture twice stores it once and returns the existing name.
+Assigning one photo to a thousand products costs one file on disk.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_sha256(content):
+    """SHA-256 hex digest of a File, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    def hashed_name(self, name, sha256):
+        directory, filename = os.path.split(name)
+        _, ext = os.path.splitext(filename)
+        return os.path.join(directory, sha256[:2], f"{sha256}{ext.lower()}").replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content_sha256(content))
+        if self.exists(name):
+            # Same bytes are already stored
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+image_storage = ContentHashStorage()
@@ -0,0 +1,217 @@
+"""
+Search-as-you-type suggestions from an in-process prefix index.
+
+Each worker keeps a sorted array of search keys: every word-start suffix of
+each product and category name, normalized. A prefix lookup is a bisect into
+that array followed by a short scan, so it never touches the database.
+Products are ranked by units sold, categories by product count. Top lists
+for one- and two-character prefixes are precomputed, because those ranges
+cover much of the array.
+
+The index is built on the first request a worker serves. Afterwards it is
+checked at most once every CHECK_INTERVAL seconds against the catalog
+fragment version (see shop.fragments), which is a cache read, not a query:
+
+- product changes are applied incrementally: only products whose
+  updated_at moved past the last load are re-read;
+- category changes, deletions (found by a row count) and indexes older
+  than FULL_REBUILD_INTERVAL trigger a full rebuild, which also refreshes
+  popularity.
+
+A refresh builds a new index and swaps it in. Only the request that wins the
+worker's refresh lock does that work; concurrent requests keep answering
+from the current index.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from . import fragments
+from .models import Category, Product
+
+
+CHECK_INTERVAL = 1.0
+FULL_REBUILD_INTERVAL = 10 * 60
+SHORT_PREFIX = 2
+MAX_LIMIT = 20
+
+# Sorts after every character a normalized key can hold
+HIGHEST = '\uffff'
+WORD_START_RE = re.compile(r'(?:^|\s)(?=\w)')
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced text"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.findall(r'\w+', text.casefold()))
+
+
+def search_keys(name):
+    """The normalized name from each word onwards: 'red wool hat' -> 3 keys"""
+    text = normalize(name)
+    return [text[match.end():] for match in WORD_START_RE.finditer(text)]
+
+
+def url_template(view_name, sample):
+    """'/product/{}/' for a one-argument route; reverse() per result costs more than the lookup"""
+    return reverse(view_name, args=[sample]).replace(str(sample), '{}')
+
+
+class PrefixIndex:
+    """Parallel sorted `keys` / `refs` arrays over {ref: (name, score, extra)}"""
+
+    def __init__(self, entries, keys=None, refs=None, short=None):
+        self.entries = entries
+        if keys is None:
+            pairs = sorted((key, ref) for ref, entry in entries.items() for key in search_keys(entry[0]))
+            keys, refs = [key for key, _ in pairs], [ref for _, ref in pairs]
+        self.keys, self.refs = keys, refs
+        if short is None:
+            short = {}
+            for prefix in {key[:length] for key in keys for length in range(1, SHORT_PREFIX + 1)}:
+                short[prefix] = self._scan(prefix, MAX_LIMIT)
+        self.short = short
+
+    def _scan(self, prefix, limit):
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + HIGHEST, lo=start)
+        refs = set(self.refs[start:end])
+        return heapq.nlargest(limit, refs, key=lambda ref: (self.entries[ref][1], ref))
+
+    def lookup(self, prefix, limit):
+        if not prefix:
+            return []
+        if len(prefix) <= SHORT_PREFIX:
+            return self.short.get(prefix, [])[:limit]
+        return self._scan(prefix, limit)
+
+    def updated(self, changes):
+        """A new index with {ref: entry} changes applied, without re-sorting everything"""
+        entries, keys, refs = dict(self.entries), list(self.keys), list(self.refs)
+        touched = set()
+        for ref, entry in changes.items():
+            old = entries.get(ref)
+            for key in search_keys(old[0]) if old else ():
+                i = bisect.bisect_left(keys, key)
+                while i < len(keys) and keys[i] == key and refs[i] != ref:
+                    i += 1
+                if i < len(keys) and keys[i] == key:
+                    del keys[i], refs[i]
+                    touched.add(key)
+            entries[ref] = entry
+            for key in search_keys(entry[0]):
+                i = bisect.bisect_right(keys, key)
+                keys.insert(i, key)
+                refs.insert(i, ref)
+                touched.add(key)
+        index = PrefixIndex(entries, keys, refs, short=dict(self.short))
+        for prefix in {key[:length] for key in touched for length in range(1, SHORT_PREFIX + 1)}:
+            index.short[prefix] = index._scan(prefix, MAX_LIMIT)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Suggester:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.products = None
+        self.categories = None
+        self.version = None
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self.watermark = None
+        self.urls = {}
+
+    def _product_rows(self, queryset):
+        return queryset.order_by().annotate(
+            sold=Coalesce(Sum('orderitem__quantity'), 0),
+        ).values_list('id', 'name', 'sold', 'updated_at')
+
+    def _full_rebuild(self, version):
+        started = time.time()
+        entries, watermark = {}, None
+        for pk, name, sold, updated_at in self._product_rows(Product.objects.all()).iterator(chunk_size=5000):
+            entries[pk] = (name, sold, None)
+            watermark = updated_at if watermark is None else max(watermark, updated_at)
+        categories = {
+            pk: (name, count, slug)
+            for pk, name, slug, count in Category.objects.annotate(count=Count('products')).values_list(
+                'id', 'name', 'slug', 'count',
+            )
+        }
+        self.products, self.categories = PrefixIndex(entries), PrefixIndex(categories)
+        self.urls = {
+            'product': url_template('product_detail', 2147483647),
+            'category': url_template('category_detail', 'suggest-slug'),
+        }
+        self.version, self.watermark, self.loaded_at = version, watermark, started
+
+    def _apply_product_changes(self, version):
+        """Re-read products updated since the last load; False if a rebuild is needed"""
+        if Product.objects.count() < len(self.products):
+            return False  # something was deleted
+        changed = self._product_rows(Product.objects.filter(updated_at__gte=self.watermark - timedelta(seconds=1)))
+        changes, watermark = {}, self.watermark
+        for pk, name, sold, updated_at in changed:
+            changes[pk] = (name, sold, None)
+            watermark = max(watermark, updated_at)
+        if changes:
+            self.products = self.products.updated(changes)
+        self.version, self.watermark = version, watermark
+        return True
+
+    def refresh(self, blocking=False):
+        if not self.lock.acquire(blocking=blocking):
+            return
+        try:
+            generations = fragments.get_generations('categories', 'products')
+            version = (generations['categories'], generations['products'])
+            if self.products is not None and version == self.version \
+                    and time.time() - self.loaded_at < FULL_REBUILD_INTERVAL:
+                return
+            categories_changed = self.version is None or version[0] != self.version[0]
+            stale = time.time() - self.loaded_at >= FULL_REBUILD_INTERVAL
+            if categories_changed or stale or self.watermark is None or not self._apply_product_changes(version):
+                self._full_rebuild(version)
+        finally:
+            self.checked_at = time.monotonic()
+            self.lock.release()
+
+    def suggest(self, query, limit=8):
+        if self.products is None:
+            self.refresh(blocking=True)
+        elif time.monotonic() - self.checked_at >= CHECK_INTERVAL:
+            self.refresh()
+
+        prefix = normalize(query)
+        limit = max(1, min(limit, MAX_LIMIT))
+        products, categories, urls = self.products, self.categories, self.urls
+        return {
+            'categories': [
+                {'id': pk, 'name': categories.entries[pk][0],
+                 'url': urls['category'].format(categories.entries[pk][2])}
+                for pk in categories.lookup(prefix, min(limit, 3))
+            ],
+            'products': [
+                {'id': pk, 'name': products.entries[pk][0], 'url': urls['product'].format(pk)}
+                for pk in products.lookup(prefix, limit)
+            ],
+        }
+
+
+suggester = Suggester()
+
+
+def suggest(query, limit=8):
+    return suggester.suggest(query, limit)
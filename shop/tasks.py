@@ -0,0 +1,24 @@
+"""
+Background job handlers (run by `run_jobs`).
+"""
+from . import invoices, outbox, renditions
+from .jobs import task
+from .models import Order
+
+
+@task('render_invoice')
+def render_invoice(order_id):
+    order = Order.objects.get(id=order_id)
+    invoices.get_invoice(order)
+
+
+@task('deliver_email')
+def deliver_email(outbox_id):
+    """Send one recorded customer email (see shop.outbox)"""
+    outbox.deliver(outbox_id)
+
+
+@task('generate_renditions')
+def generate_renditions(name):
+    """Resize a newly saved product/category image (see shop.renditions)"""
+    renditions.generate_renditions(name)
@@ -1,4 +1,7 @@
 from django import template
+from django.utils.html import format_html
+
+from shop import renditions
 
 register = template.Library()
 
@@ -9,3 +12,26 @@ def get_item(dictionary, key):
     if isinstance(dictionary, dict):
         return dictionary.get(key, None)
     return None
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes='100vw'):
+    """
+    <picture> for an ImageField with WebP and JPEG srcsets of its renditions.
+    Falls back to the original file until renditions have been generated.
+    """
+    widths = renditions.available_widths(image.name, image.storage)
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">', image.url, alt, css_class,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        renditions.srcset(image.name, widths, 'webp', image.storage), sizes,
+        image.storage.url(renditions.rendition_name(image.name, widths[-1], 'jpg')),
+        renditions.srcset(image.name, widths, 'jpg', image.storage), sizes,
+        alt, css_class,
+    )
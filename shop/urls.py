@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Home & Landing
@@ -19,6 +19,7 @@ urlpatterns = [
     
     # Search
     path('search/', views.search_products, name='search_products'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     
     # Cart URLs
     path('cart/', views.view_cart, name='view_cart'),
@@ -33,9 +34,18 @@ urlpatterns = [
     
     # Admin URLs
     path('admin-orders/', views.admin_orders, name='admin_orders'),
+    path('admin-orders/<int:order_id>/detail/', views.admin_order_detail, name='admin_order_detail'),
     path('admin/order/<int:order_id>/update-status/', views.update_order_status, name='update_order_status'),
     
     # User Profile & Orders
     path('accounts/profile/', views.user_profile, name='user_profile'),
     path('orders/my-orders/', views.my_orders, name='my_orders'),
+
+    # Read-only catalog API
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/<int:pk>/', api.product_detail, name='api_product_detail'),
+    path('api/categories/', api.category_list, name='api_category_list'),
+
+    # Prometheus metrics (staff or SHOP_METRICS_TOKEN)
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
@@ -6,58 +7,144 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
-from django.db.models import Q, Sum
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from decimal import Decimal
-from datetime import datetime
+from django.db.models import Count, Prefetch, prefetch_related_objects
+from django.utils.functional import SimpleLazyObject
 from .models import Product, Cart, CartItem, Order, OrderItem, Category
-from .forms import AddToCartForm, UpdateCartItemForm, CheckoutForm, RegisterForm, LoginForm
-from django.core.mail import EmailMessage
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import io
-from decimal import Decimal
+from .forms import AddToCartForm, UpdateCartItemForm, CheckoutForm, RegisterForm, LoginForm, OrderFilterForm
+from .pagination import paginate_request, base_query
+from . import covers, facets, fragments, guest_cart, reservations, search, suggest, invoices, metrics as request_metrics
+from .http import serve_stored_file
+from .orders import place_order
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+import logging
 
+logger = logging.getLogger(__name__)
 
-def get_or_create_cart(request):
-    """Get or create cart for the session or user"""
 
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-        session_key = request.session.session_key
+ADMIN_ORDERS_PAGE_SIZE = 50
+MY_ORDERS_PAGE_SIZE = 10
 
-    # If user is logged in, get cart by user
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(
-            user=request.user,
-            defaults={'session_key': session_key}
-        )
-    else:
-        # Guest user: cart by session
-        cart, created = Cart.objects.get_or_create(
-            session_key=session_key,
-            user=None
-        )
 
+def get_or_create_cart(request):
+    """Get or create the logged-in user's cart (guests use shop.guest_cart)"""
+    cart, created = Cart.objects.get_or_create(
+        user=request.user,
+        defaults={'session_key': request.session.session_key or ''}
+    )
     return cart
 
+
+def add_to_guest_cart(request, product):
+    """add_to_cart for visitors who are not logged in: the cart lives in a cookie"""
+    lines = guest_cart.load(request)
+    quantity = lines.get(product.id, 0) + 1
+    # Guests hold nothing, but cannot take what signed-in carts are holding
+    available = reservations.available_to_sell([product.id]).get(product.id, 0)
+    if quantity > available:
+        return JsonResponse({
+            'success': False,
+            'error': f'Only {available} items available.' if available else 'Out of stock.'
+        })
+    if product.id not in lines and len(lines) >= guest_cart.MAX_LINES:
+        return JsonResponse({'success': False, 'error': 'Your cart is full.'})
+
+    lines[product.id] = quantity
+    response = JsonResponse({
+        'success': True,
+        'message': 'Added to cart',
+        'cart_count': guest_cart.item_count(lines),
+        'item_qty': quantity,
+    })
+    return guest_cart.save(response, lines)
+
+
+def wants_json(request):
+    """True for the AJAX "load more" variant of a listing page"""
+    return (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or request.GET.get('format') == 'json'
+    )
+
+
+def product_page_json(page):
+    """JSON payload for one keyset page of products"""
+    return JsonResponse({
+        'success': True,
+        'products': [
+            {
+                'id': product.id,
+                'name': product.name,
+                'price': str(product.price),
+                'stock': product.stock,
+                'category': product.category.name if product.category else None,
+                'image': product.image.url if product.image else None,
+            }
+            for product in page
+        ],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def order_detail_json(order):
+    """Order, its lines and totals as a JSON-ready dict (items must be prefetched)"""
+    totals = order.get_totals()
+    return {
+        'success': True,
+        'id': order.id,
+        'customer': f"{order.first_name} {order.last_name}",
+        'email': order.email,
+        'phone': order.phone,
+        'address': order.get_full_address(),
+        'created_at': order.created_at.strftime('%d %b %Y, %H:%M'),
+        'payment_method': order.get_payment_method_display(),
+        'status': order.get_status_display(),
+        'items': [
+            {
+                'product': item.product.name,
+                'quantity': item.quantity,
+                'price': str(item.price),
+                'subtotal': str(item.get_subtotal()),
+            }
+            for item in order.items.all()
+        ],
+        'subtotal': str(totals.subtotal),
+        'shipping': str(order.get_shipping_cost()),
+        'tax': f"{totals.tax:.2f}",
+        'total': str(order.total_amount),
+        'invoice_url': reverse('download_invoice', args=[order.id]),
+    }
+
+
 def product_list(request):
     """Display all products - Protected view"""
     if not request.user.is_authenticated:
         messages.error(request, 'Please login to view products.')
         return redirect('user_login')
 
-    
-    categories = Category.objects.all() 
-    products = Product.objects.select_related("category").all()
+    catalog = fragments.catalog_fragments()
+    version = catalog['catalog_version']
+    category_ids = facets.category_ids(version)
+    filters = facets.parse(request.GET, category_ids)
+    # One URL per filter set keeps the grid fragment and facet caches shared
+    canonical = facets.canonical_query(request.GET, filters)
+    if canonical is not None:
+        return redirect(f"{request.path}?{canonical}" if canonical else request.path)
+
+    products = filters.apply(Product.objects.select_related("category"), category_ids)
+    if wants_json(request):
+        return product_page_json(paginate_request(request, products))
+
     # cart_count = get_cart_count(request)
+    # The page is only evaluated when its cached fragment misses
     context = {
-        'products': products,
+        'products': SimpleLazyObject(lambda: paginate_request(request, products)),
+        'facets': facets.get_facets(filters, version),
         'page_title': 'Products',
         # 'cart_count': cart_count,
-        'categories': categories,
+        **catalog,
     }
     return render(request, 'shop/product_list.html', context)
 
@@ -82,29 +169,31 @@ def product_detail(request, pk):
 
 @require_http_methods(["POST"])
 def add_to_cart(request, pk):
-    if not request.user.is_authenticated:
-        return JsonResponse({'success': False, 'error': 'Please login first.'}, status=401)
-
     product = get_object_or_404(Product, pk=pk)
-    cart = get_or_create_cart(request)
 
     if product.stock < 1:
         return JsonResponse({'success': False, 'error': 'Out of stock.'})
 
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': 1}
-    )
+    if not request.user.is_authenticated:
+        return add_to_guest_cart(request, product)
+
+    cart = get_or_create_cart(request)
 
-    if not created:
-        if cart_item.quantity + 1 > product.stock:
+    with transaction.atomic():
+        cart_item = CartItem.objects.filter(cart=cart, product=product).first()
+        quantity = cart_item.quantity + 1 if cart_item else 1
+        # Hold the line's new total; fails if other carts hold the rest
+        reserved, available = reservations.reserve(cart, product.id, quantity)
+        if not reserved:
             return JsonResponse({
                 'success': False,
-                'error': f'Only {product.stock} items available.'
+                'error': f'Only {available} items available.' if available else 'Out of stock.'
             })
-        cart_item.quantity += 1
-        cart_item.save()
+        if cart_item:
+            cart_item.quantity = quantity
+            cart_item.save()
+        else:
+            cart_item = CartItem.objects.create(cart=cart, product=product, quantity=quantity)
 
     return JsonResponse({
         'success': True,
@@ -122,7 +211,7 @@ def view_cart(request):
 
     
     cart = get_or_create_cart(request)
-    cart_items = cart.items.all()
+    cart_items = cart.prefetch_items()
     # cart_count = get_cart_count(request)
     
     # Create form instances for each item
@@ -144,25 +233,34 @@ def view_cart(request):
 @require_http_methods(["POST"])
 def update_cart_item(request, item_id):
     """Update quantity of cart item"""
-    cart_item = get_object_or_404(CartItem, id=item_id)
+    if not request.user.is_authenticated:
+        return redirect('user_login')
+
+    cart_item = get_object_or_404(CartItem.objects.select_related('product'), id=item_id)
     cart = get_or_create_cart(request)
     
     # Verify cart ownership
-    if cart_item.cart.id != cart.id:
+    if cart_item.cart_id != cart.id:
         messages.error(request, 'Invalid cart item.')
         return redirect('view_cart')
     
     form = UpdateCartItemForm(request.POST, instance=cart_item)
     
+    if form.is_valid():
+        reserved, available = reservations.reserve(cart, cart_item.product_id, form.cleaned_data['quantity'])
+        if not reserved:
+            form.add_error('quantity', f'Only {available} items available.')
+
     if form.is_valid():
         form.save()
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            totals = cart.get_totals()
             return JsonResponse({
                 'success': True,
                 'message': 'Cart updated successfully!',
                 'new_subtotal': float(cart_item.get_subtotal()),
-                'new_total': float(cart.get_total()),
-                'cart_count': cart.get_item_count()
+                'new_total': float(totals.subtotal),
+                'cart_count': totals.quantity
             })
         messages.success(request, 'Cart updated successfully!')
     else:
@@ -181,23 +279,28 @@ def update_cart_item(request, item_id):
 @require_http_methods(["POST"])
 def remove_from_cart(request, item_id):
     """Remove item from cart"""
-    cart_item = get_object_or_404(CartItem, id=item_id)
+    if not request.user.is_authenticated:
+        return redirect('user_login')
+
+    cart_item = get_object_or_404(CartItem.objects.select_related('product'), id=item_id)
     cart = get_or_create_cart(request)
     
     # Verify cart ownership
-    if cart_item.cart.id != cart.id:
+    if cart_item.cart_id != cart.id:
         messages.error(request, 'Invalid cart item.')
         return redirect('view_cart')
     
     product_name = cart_item.product.name
     cart_item.delete()
+    reservations.release(cart, [cart_item.product_id])
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        totals = cart.get_totals()
         return JsonResponse({
             'success': True,
             'message': f'{product_name} removed from cart!',
-            'cart_count': cart.get_item_count(),
-            'cart_total': float(cart.get_total())
+            'cart_count': totals.quantity,
+            'cart_total': float(totals.subtotal)
         })
     
     messages.success(request, f'{product_name} removed from cart!')
@@ -211,9 +314,9 @@ def checkout(request):
         return redirect('user_login')
 
     cart = get_or_create_cart(request)
-    cart_items = cart.items.all()
+    cart_items = cart.prefetch_items()
 
-    if not cart_items.exists():
+    if not cart_items:
         messages.error(request, 'Your cart is empty!')
         return redirect('product_list')
     
@@ -222,133 +325,18 @@ def checkout(request):
         
         if form.is_valid():
             try:
-                with transaction.atomic():
-
-                    # ====== CALCULATE TOTAL ======
-                    subtotal = cart.get_total()
-                    tax = subtotal * Decimal('0.18')
-                    grand_total = subtotal + tax
-
-                    # ====== CREATE ORDER ======
-                    order = Order.objects.create(
-                        first_name=form.cleaned_data['first_name'],
-                        last_name=form.cleaned_data['last_name'],
-                        email=form.cleaned_data['email'],
-                        phone=form.cleaned_data['phone'],
-                        address=form.cleaned_data['address'],
-                        city=form.cleaned_data['city'],
-                        state=form.cleaned_data['state'],
-                        postal_code=form.cleaned_data['postal_code'],
-                        total_amount=grand_total,
-                        payment_method=form.cleaned_data['payment_method'],
-                        status='pending',
-                        user=request.user
-                    )
-
-                    # ====== CREATE ORDER ITEMS ======
-                    for cart_item in cart_items:
-                        OrderItem.objects.create(
-                            order=order,
-                            product=cart_item.product,
-                            quantity=cart_item.quantity,
-                            price=cart_item.product.price
-                        )
-
-                        # Reduce stock
-                        product = cart_item.product
-                        product.stock -= cart_item.quantity
-                        product.save()
-
-                    # ====== CLEAR CART ======
-                    cart.items.all().delete()
-
-                    # =====================================================
-                    # =============== GENERATE PDF IN MEMORY ===============
-                    # =====================================================
-                    buffer = io.BytesIO()
-                    p = canvas.Canvas(buffer, pagesize=A4)
-
-                    p.setFont("Helvetica-Bold", 18)
-                    p.drawString(50, 800, "ShopHub - Invoice")
-
-                    p.setFont("Helvetica", 11)
-                    p.drawString(50, 770, f"Order ID: {order.id}")
-                    p.drawString(50, 750, f"Customer: {order.first_name} {order.last_name}")
-                    p.drawString(50, 730, f"Email: {order.email}")
-
-                    y = 700
-                    p.drawString(50, y, "Items:")
-                    y -= 20
-
-                    calc_subtotal = Decimal("0.00")
-
-                    for item in order.items.all():
-                        line_total = item.price * item.quantity
-                        calc_subtotal += line_total
-
-                        p.drawString(50, y, f"{item.product.name} (x{item.quantity})")
-                        p.drawString(400, y, f"₹{line_total}")
-                        y -= 20
-
-                    calc_tax = calc_subtotal * Decimal("0.18")
-                    calc_grand = calc_subtotal + calc_tax
-
-                    y -= 30
-                    p.drawString(50, y, f"Subtotal: ₹{calc_subtotal}")
-                    y -= 20
-                    p.drawString(50, y, f"GST (18%): ₹{calc_tax}")
-                    y -= 20
-                    p.setFont("Helvetica-Bold", 12)
-                    p.drawString(50, y, f"Grand Total: ₹{calc_grand}")
-
-                    p.showPage()
-                    p.save()
-
-                    buffer.seek(0)
-
-                    # =====================================================
-                    # ================= SEND EMAIL + PDF ==================
-                    # =====================================================
-                    email_subject = f"ShopHub Invoice - Order #{order.id}"
-
-                    email_body = f"""
-Hello {order.first_name},
-
-Thank you for shopping with ShopHub ❤️
-
-Your order has been placed successfully.
-
-Order ID: {order.id}
-Total Amount: ₹{calc_grand}
-
-Your invoice PDF is attached with this email.
-
-We will ship your order soon.
-
-Thanks & Regards,
-ShopHub Team
-"""
-
-                    email = EmailMessage(
-                        subject=email_subject,
-                        body=email_body,
-                        from_email="king143krish@gmail.com",
-                        to=[order.email],
-                    )
-
-                    email.attach(
-                        f"invoice_{order.id}.pdf",
-                        buffer.getvalue(),
-                        "application/pdf"
-                    )
+                result = place_order(request.user, cart, form.cleaned_data)
 
-                    email.send(fail_silently=False)
+                if not result.ok:
+                    for line in result.out_of_stock:
+                        messages.error(request, str(line))
+                    return redirect('view_cart')
 
-                    messages.success(request, 'Order placed successfully! Invoice sent to your email.')
-                    return redirect('order_confirmation', order_id=order.id)
+                messages.success(request, 'Order placed successfully! Your invoice will be emailed to you shortly.')
+                return redirect('order_confirmation', order_id=result.order.id)
 
-            except Exception as e:
-                print("CHECKOUT ERROR:", e)
+            except Exception:
+                logger.exception("Checkout failed for user %s", request.user.pk)
                 messages.error(request, 'An error occurred while placing your order.')
                 return redirect('checkout')
 
@@ -356,6 +344,8 @@ ShopHub Team
             for field, errors in form.errors.items():
                 messages.error(request, f'{field}: {", ".join(errors)}')
     else:
+        # Filling in the form should not cost the customer their holds
+        reservations.extend(cart)
         form = CheckoutForm(initial={
             'email': request.user.email,
             'first_name': request.user.first_name,
@@ -363,17 +353,15 @@ ShopHub Team
         })
 
     # cart_count = get_cart_count(request)
-    subtotal = cart.get_total()
-    tax = subtotal * Decimal('0.18')
-    grand_total = subtotal + tax
+    totals = cart.get_totals()
 
     context = {
         'form': form,
         'cart': cart,
         'cart_items': cart_items,
-        'subtotal': subtotal,
-        'tax': tax,
-        'grand_total': grand_total,
+        'subtotal': totals.subtotal,
+        'tax': totals.tax,
+        'grand_total': totals.grand_total,
         'page_title': 'Checkout',
         # 'cart_count': cart_count
     }
@@ -382,58 +370,11 @@ ShopHub Team
 
 
 def order_confirmation(request, order_id):
-    """Order confirmation page"""
-    from django.core.mail import send_mail
-    from django.conf import settings
-    
-    order = get_object_or_404(Order, id=order_id)
-    order_items = order.items.all()
+    """Order confirmation page (emails are sent from the outbox, not here)"""
+    order = get_object_or_404(Order.objects.with_totals(), id=order_id)
+    order_items = order.items.select_related('product')
     # cart_count = get_cart_count(request)
     
-    # Send confirmation email
-    try:
-        email_subject = f'Order Confirmation #{order.id} - ShopHub'
-        email_body = f"""
-Hello {order.first_name},
-
-Thank you for your order!
-
-Order Number: #{order.id}
-Order Date: {order.created_at.strftime('%d-%m-%Y %H:%M:%S')}
-Status: {order.get_status_display()}
-
-Delivery Address:
-{order.address}
-{order.city}, {order.state} {order.postal_code}
-
-Order Summary:
-Subtotal: Rs{order.get_subtotal():.2f}
-Shipping: FREE
-Tax (18% GST): Rs{order.get_tax():.2f}
-Total Amount: Rs{order.total_amount:.2f}
-
-Payment Method: Cash on Delivery (COD)
-You'll pay when your order arrives at your doorstep.
-
-We'll process your order shortly and send you tracking details.
-
-Thank you for shopping with us!
-
-Best regards,
-ShopHub Team
-support@shophub.com
-        """
-        
-        send_mail(
-            email_subject,
-            email_body,
-            settings.EMAIL_HOST_USER,   # sender
-            [order.email],              # receiver (customer)
-            fail_silently=False         # show error if email fails
-        )
-    except Exception as e:
-        print(f"Error sending email: {e}")
-    
     context = {
         'order': order,
         'order_items': order_items,
@@ -442,153 +383,27 @@ support@shophub.com
     }
     return render(request, 'shop/order_confirmation.html', context)
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from django.http import FileResponse
-import io
-
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from django.http import FileResponse
-import io
-from decimal import Decimal
-from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404
-
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from django.http import FileResponse
-import io
-from decimal import Decimal
-
 @login_required(login_url='user_login')
 def download_invoice(request, order_id):
+    """Stream the stored invoice PDF, rendering it only if the order changed"""
     order = get_object_or_404(Order, id=order_id)
-
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # Colors & fonts
-    p.setStrokeColor(colors.HexColor("#9ca3af"))  # soft gray
-    p.setLineWidth(0.7)
-
-    y = height - 50
-
-    # ===== HEADER =====
-    p.setFont("Helvetica-Bold", 18)
-    p.drawString(50, y, "ShopHub")
-    
-    p.setFont("Helvetica", 11)
-    p.drawRightString(width-50, y, f"Order ID: {order.id}")
-    y -= 20
-    p.drawRightString(width-50, y, f"Date: {order.created_at.strftime('%d-%m-%Y')}")
-
-    # Line
-    y -= 20
-    p.line(50, y, width-50, y)
-
-    # ===== INVOICE TITLE =====
-    y -= 40
-    p.setFont("Helvetica-Bold", 22)
-    p.drawString(50, y, "INVOICE")
-
-    # ===== BILL TO =====
-    y -= 40
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, "Bill To:")
-
-    p.setFont("Helvetica", 11)
-    y -= 18
-    p.drawString(50, y, f"Name: {order.first_name} {order.last_name}")
-    y -= 16
-    p.drawString(50, y, f"Phone: {order.phone}")
-    y -= 16
-    p.drawString(50, y, f"Address: {order.address}, {order.city}, {order.state} - {order.postal_code}")
-
-    # ===== TABLE HEADER =====
-    y -= 40
-    p.line(50, y, width-50, y)
-    y -= 20
-
-    p.setFont("Helvetica-Bold", 11)
-    p.drawString(50, y, "Item")
-    p.drawString(300, y, "Qty")
-    p.drawString(360, y, "Price")
-    p.drawString(450, y, "Total")
-
-    y -= 10
-    p.line(50, y, width-50, y)
-
-    # ===== ITEMS =====
-    p.setFont("Helvetica", 11)
-    y -= 20
-
-    subtotal = Decimal("0.00")
-
-    for item in order.items.all():
-        line_total = item.price * item.quantity
-        subtotal += line_total
-
-        p.drawString(50, y, item.product.name[:40])
-        p.drawString(300, y, str(item.quantity))
-        p.drawString(360, y, f"Rs. {item.price:.2f}")
-        p.drawString(450, y, f"Rs. {line_total:.2f}")
-        y -= 20
-
-        if y < 150:
-            p.showPage()
-            y = height - 100
-
-    # ===== TOTALS =====
-    y -= 10
-    p.line(50, y, width-50, y)
-
-    tax = subtotal * Decimal("0.18")
-    grand_total = subtotal + tax
-
-    y -= 30
-    p.setFont("Helvetica", 11)
-    p.drawRightString(430, y, "Subtotal:")
-    p.drawRightString(width-50, y, f"Rs. {subtotal:.2f}")
-
-    y -= 20
-    p.drawRightString(430, y, "GST (18%):")
-    p.drawRightString(width-50, y, f"Rs. {tax:.2f}")
-
-    y -= 25
-    p.setFont("Helvetica-Bold", 12)
-    p.drawRightString(430, y, "Grand Total:")
-    p.drawRightString(width-50, y, f"Rs. {grand_total:.2f}")
-
-    # ===== FOOTER =====
-    y -= 60
-    p.setFont("Helvetica", 10)
-    p.setFillColor(colors.grey)
-    p.drawString(50, y, "Thank you for your purchase!")
-    y -= 14
-    p.drawString(50, y, "For support, contact support@shophub.com")
-
-    p.showPage()
-    p.save()
-
-    buffer.seek(0)
-    return FileResponse(buffer, as_attachment=True, filename=f"invoice_{order.id}.pdf")
+    path = invoices.get_invoice(order)
+
+    return serve_stored_file(
+        request,
+        default_storage,
+        path,
+        etag=f'"{order.invoice_sha256}"',
+        last_modified=order.invoice_rendered_at,
+        filename=f"invoice_{order.id}.pdf",
+        content_type='application/pdf',
+    )
 
 
 def home(request):
     """Landing page - Simple and clean"""
-    categories = Category.objects.all()
-    
-    # Add random product image to each category if no category image
-    for category in categories:
-        if not category.image:
-            random_product = category.products.filter(image__isnull=False).exclude(image='').first()
-            if random_product:
-                category.random_image = random_product.image
-            else:
-                category.random_image = None
+    # Counts in the category query; covers come from one cached query
+    categories = covers.attach_covers(list(Category.objects.annotate(product_count=Count('products'))))
     
     # cart_count = get_cart_count(request) if request.user.is_authenticated else 0
     context = {
@@ -657,7 +472,14 @@ def user_login(request):
                     login(request, user)
                     messages.success(request, f'Welcome back, {user.first_name or user.username}!')
                     next_url = request.GET.get('next', 'product_list')
-                    return redirect(next_url)
+
+                    # Move the guest cookie cart into the user's cart
+                    guest_lines = guest_cart.load(request)
+                    response = redirect(next_url)
+                    if guest_lines:
+                        guest_cart.merge_into_user_cart(user, guest_lines, request.session.session_key)
+                        guest_cart.save(response, {})
+                    return response
         else:
             # Form validation errors (empty fields, etc.)
             for field, errors in form.errors.items():
@@ -687,14 +509,16 @@ def category_detail(request, slug):
         return redirect('user_login')   
 
     category = get_object_or_404(Category, slug=slug)
-    products = category.products.all()
-    categories = Category.objects.all()
-    
+    products = category.products.select_related("category")
+    if wants_json(request):
+        return product_page_json(paginate_request(request, products))
+
     context = {
         'category': category,
-        'products': products,
-        'categories': categories,
-        'page_title': f'{category.name} Products'
+        'products': SimpleLazyObject(lambda: paginate_request(request, products)),
+        'categories': Category.objects.all(),
+        'page_title': f'{category.name} Products',
+        **fragments.catalog_fragments(),
     }
     return render(request, 'shop/category_detail.html', context)
 
@@ -707,24 +531,44 @@ def search_products(request):
 
     
     query = request.GET.get('q', '').strip()
-    products = []
-    categories = Category.objects.all()
-    
-    if query:
-        products = Product.objects.filter(
-            Q(name__icontains=query) | Q(description__icontains=query)
+
+    def results():
+        if not query:
+            return []
+        page = search.search_products(
+            query,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
         )
+        page.base_query = base_query(request)
+        return page
+
+    if query and wants_json(request):
+        return product_page_json(results())
     
     # cart_count = get_cart_count(request)
     context = {
         'query': query,
-        'products': products,
-        'categories': categories,
+        'products': SimpleLazyObject(results),
+        'categories': Category.objects.all(),
         'page_title': f'Search Results for "{query}"' if query else 'Search',
         # 'cart_count': cart_count
+        **fragments.catalog_fragments(),
     }
     return render(request, 'shop/search_results.html', context)
 
+@require_http_methods(["GET"])
+def search_suggest(request):
+    """Autocomplete for the search box, answered from the in-process prefix index"""
+    try:
+        limit = int(request.GET.get('limit', 8))
+    except ValueError:
+        limit = 8
+    query = request.GET.get('q', '')
+    response = JsonResponse({'query': query, **suggest.suggest(query, limit)})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
 # Admin/Order Management Views
 
 def admin_orders(request):
@@ -734,17 +578,31 @@ def admin_orders(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    orders = Order.objects.all().order_by('-created_at')
+    filter_form = OrderFilterForm(request.GET or None)
+    orders = paginate_request(request, filter_form.filter(Order.objects.all()), page_size=ADMIN_ORDERS_PAGE_SIZE)
     # cart_count = get_cart_count(request) if request.user.is_authenticated else 0
     
     context = {
         'orders': orders,
+        'filter_form': filter_form,
         'page_title': 'Order Management',
         # 'cart_count': cart_count
     }
     return render(request, 'shop/admin_orders.html', context)
 
 
+def admin_order_detail(request, order_id):
+    """Order items and totals for the admin dashboard modal, loaded on demand"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    order = get_object_or_404(
+        Order.objects.prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product'))),
+        id=order_id,
+    )
+    return JsonResponse(order_detail_json(order))
+
+
 @require_http_methods(["POST"])
 def update_order_status(request, order_id):
     """Update order status"""
@@ -762,7 +620,7 @@ def update_order_status(request, order_id):
     order.save()
     
     # Log the status change
-    print(f"Order #{order_id} status changed from '{old_status}' to '{new_status}' by {request.user.username}")
+    logger.info("Order #%s status changed from '%s' to '%s' by %s", order_id, old_status, new_status, request.user.username)
     
     return JsonResponse({
         'success': True,
@@ -795,7 +653,11 @@ def user_profile(request):
 def my_orders(request):
     """User orders history page"""
     user = request.user
-    orders = Order.objects.filter(user=user).order_by('-created_at')
+    # One page of orders, then all their lines and products in one batch
+    orders = paginate_request(request, Order.objects.filter(user=user).with_totals(), page_size=MY_ORDERS_PAGE_SIZE)
+    prefetch_related_objects(
+        orders.items, Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+    )
     # cart_count = get_cart_count(request)
     
     context = {
@@ -803,4 +665,12 @@ def my_orders(request):
         'page_title': 'My Orders',
         # 'cart_count': cart_count
     }
-    return render(request, 'shop/my_orders.html', context)
\ No newline at end of file
+    return render(request, 'shop/my_orders.html', context)
+
+def metrics(request):
+    """Per-view request, latency and SQL metrics in Prometheus text format"""
+    token = settings.SHOP_METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not request.user.is_staff and not (token and constant_time_compare(bearer, token)):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(request_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,11 +47,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'shop.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'shop.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -154,3 +157,49 @@ import os
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Background jobs (shop.jobs). Run `python manage.py run_jobs` alongside the
+# web workers; set SHOP_JOBS_EAGER = True to run jobs in-process instead.
+SHOP_JOBS_EAGER = os.environ.get("SHOP_JOBS_EAGER") == "1"
+
+# Shared cache, the L2 tier of shop.caching. Redis when REDIS_URL is set
+# (needs the redis package); otherwise a file cache that every worker on
+# this host shares. Point it at LocMemCache for tests.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("SHOP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "shophub-cache")),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# In-process L1 tier in front of it (see shop/caching.py)
+SHOP_CACHE = {
+    "L2": "default",
+    "L1_MAX_ENTRIES": 1000,
+    "L1_TIMEOUT": 5,
+}
+
+# Per-view request metrics (see shop/metrics.py). Every worker writes its
+# totals here; /metrics adds them up. Empty the directory on deploy.
+SHOP_METRICS_DIR = os.environ.get("SHOP_METRICS_DIR", os.path.join(tempfile.gettempdir(), "shophub-metrics"))
+# Lets a Prometheus scraper read /metrics with "Authorization: Bearer <token>"
+SHOP_METRICS_TOKEN = os.environ.get("SHOP_METRICS_TOKEN", "")
+
+# Slow-request profiler (see shop/profiling.py; `manage.py profiles` reads them)
+SHOP_PROFILING = {
+    "DIR": os.environ.get("SHOP_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "shophub-profiles")),
+    "SAMPLE_RATE": float(os.environ.get("SHOP_PROFILE_SAMPLE_RATE", "0")),
+    "SLOW_THRESHOLD": float(os.environ.get("SHOP_PROFILE_SLOW_THRESHOLD", "1.0")),
+}
+
+# Seconds an add-to-cart holds stock for a signed-in cart (see shop/reservations.py)
+SHOP_RESERVATION_TTL = int(os.environ.get("SHOP_RESERVATION_TTL", 15 * 60))